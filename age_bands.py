@@ -0,0 +1,98 @@
+"""Ordered age-band model of the heavy-driver workforce.
+
+Heavy drivers (the "Apagão" scope, `aggregates.alert_scope`) are counted per
+unit (municipality or region), category and age band once, and kept as
+cumulative sums over the bands in `utils.AGE_ORDER`. The drivers of any
+contiguous range of bands are then the difference of two prefix sums, so
+redefining "new entrants" or "veterans" costs O(1) per unit instead of a
+new scan of the dataset.
+"""
+import numpy as np
+import pandas as pd
+
+import aggregates
+import utils
+
+# Default band ranges (first band, last band) of the replacement index
+NEW_ENTRANTS = (aggregates.NEW_ENTRANTS_AGES[0], aggregates.NEW_ENTRANTS_AGES[-1])
+VETERANS = (aggregates.VETERANS_AGES[0], aggregates.VETERANS_AGES[-1])
+
+
+def range_label(bands):
+    """'18-30' for ('18-21 ANOS', '26-30 ANOS')."""
+    first, last = bands
+    return f"{utils.AGE_BOUNDS[first][0]}-{utils.AGE_BOUNDS[last][1]}"
+
+
+class AgeBandModel:
+    """Heavy drivers per unit, category and age band, as prefix sums over the bands.
+
+    Attributes:
+        units (pd.Index): Municipalities or regions.
+        prefix (np.ndarray): Shape (units, len(aggregates.CATEGORIES), len(utils.AGE_ORDER) + 1);
+                             `prefix[..., i]` counts the drivers of the first `i` bands.
+    """
+
+    def __init__(self, units, prefix):
+        self.units = units
+        self.prefix = prefix
+
+    @classmethod
+    def from_facts(cls, df):
+        """Builds the per-municipality model from the compacted dataset."""
+        cities, counts = aggregates.heavy_tensor(df)
+        counts = counts.astype('int64')
+
+        prefix = np.zeros(counts.shape[:2] + (counts.shape[2] + 1,), dtype='int64')
+        np.cumsum(counts, axis=2, out=prefix[:, :, 1:])
+        return cls(pd.Index(cities.astype(str), name='descricao_municipio'), prefix)
+
+    def rollup(self, mapping):
+        """The model of coarser units.
+
+        Prefix sums are additive, so each region's are the sum of its municipalities'.
+
+        Args:
+            mapping (pd.Series): Unit of each current unit (e.g. the micro-region
+                                 of each municipality), indexed like `units`.
+        """
+        codes, units = pd.factorize(mapping.reindex(self.units), sort=True)
+        prefix = np.zeros((len(units),) + self.prefix.shape[1:], dtype='int64')
+        np.add.at(prefix, codes, self.prefix)
+        return AgeBandModel(pd.Index(units, name=mapping.name), prefix)
+
+    def count(self, bands):
+        """Drivers from the first to the last band of `bands`, inclusive.
+
+        Returns:
+            np.ndarray: Shape (units, len(aggregates.CATEGORIES)).
+        """
+        first, last = (utils.AGE_ORDER.index(band) for band in bands)
+        if first > last:
+            raise ValueError(f'Empty age range: {bands}')
+        return self.prefix[:, :, last + 1] - self.prefix[:, :, first]
+
+    def by_category(self, entrants=NEW_ENTRANTS, veterans=VETERANS):
+        """Entrants and veterans per category, summed over every unit.
+
+        Returns:
+            pd.DataFrame: Indexed by `aggregates.CATEGORIES` with 'novos_entrantes' and 'veteranos'.
+        """
+        return pd.DataFrame({
+            'novos_entrantes': self.count(entrants).sum(axis=0),
+            'veteranos': self.count(veterans).sum(axis=0),
+        }, index=pd.Index(aggregates.CATEGORIES, name='categoria'))
+
+    def replacement_index(self, entrants=NEW_ENTRANTS, veterans=VETERANS):
+        """Entrants over veterans per unit (0 where there are no veterans).
+
+        Returns:
+            pd.DataFrame: Indexed by `units` with 'novos_entrantes', 'veteranos'
+                          and 'indice_reposicao'.
+        """
+        table = pd.DataFrame({
+            'novos_entrantes': self.count(entrants).sum(axis=1),
+            'veteranos': self.count(veterans).sum(axis=1),
+        }, index=self.units)
+        table['indice_reposicao'] = (table['novos_entrantes'] / table['veteranos'].where(table['veteranos'] > 0)).fillna(0.0)
+        return table
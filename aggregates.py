@@ -0,0 +1,253 @@
+"""Dashboard aggregates shared by the pages and the JSON API.
+
+Every function takes the dataset returned by `utils.load_data` and returns
+the numbers exactly as the dashboard shows them.
+"""
+import numpy as np
+import pandas as pd
+
+import segments
+import utils
+
+NEW_ENTRANTS_AGES = ['18-21 ANOS', '22-25 ANOS', '26-30 ANOS']
+VETERANS_AGES = ['51-60 ANOS', '61-70 ANOS']
+
+# Simplified heavy categories: the category axis of `heavy_tensor`
+CATEGORIES = ['C', 'D', 'E']
+
+
+def alert_scope(df):
+    """Heavy categories as the "Apagão" page defines them (any category containing C, D or E)."""
+    return df[df['categoria_cnh'].str.contains('C|D|E', regex=True)]
+
+
+def heavy_tensor(df, flags=()):
+    """Counts heavy drivers (`alert_scope`) per municipality, category and age band.
+
+    Args:
+        df (pd.DataFrame): Compacted dataset with categorical 'descricao_municipio',
+                           'categoria_cnh' and 'faixa_etaria'.
+        flags (tuple): 'S'/'N' columns (e.g. 'condutor_bloqueado') added as
+                       extra axes of size 2, where index 1 counts 'S'.
+
+    Returns:
+        tuple: The municipalities (pd.Index) and a float array of shape
+               (municipalities, len(CATEGORIES), len(utils.AGE_ORDER), 2, ...).
+    """
+    df = alert_scope(df)
+    df = df[df['faixa_etaria'].isin(utils.AGE_ORDER)]
+
+    cities = df['descricao_municipio'].cat.remove_unused_categories()
+    category_lookup = np.array([CATEGORIES.index(utils.simplify_category(cat)) for cat in df['categoria_cnh'].cat.categories])
+    band_lookup = np.array([
+        utils.AGE_ORDER.index(band) if band in utils.AGE_ORDER else -1
+        for band in df['faixa_etaria'].cat.categories
+    ])
+
+    shape = (len(cities.cat.categories), len(CATEGORIES), len(utils.AGE_ORDER)) + (2,) * len(flags)
+    flat_index = np.ravel_multi_index(
+        (
+            cities.cat.codes.to_numpy(),
+            category_lookup[df['categoria_cnh'].cat.codes],
+            band_lookup[df['faixa_etaria'].cat.codes],
+            *((df[flag] == 'S').to_numpy(dtype=int) for flag in flags),
+        ),
+        shape
+    )
+    counts = np.bincount(flat_index, weights=df['qtd_condutores'].to_numpy(), minlength=np.prod(shape))
+
+    return pd.Index(cities.cat.categories, name='descricao_municipio'), counts.reshape(shape)
+
+
+def risk_status(mean_age):
+    return '🚨 Crítico' if mean_age > 50 else '⚠️ Atenção' if mean_age > 45 else '✅ Estável'
+
+
+def replacement_index(df):
+    """Statewide replacement index: new entrants (18-30) over veterans (51-70).
+
+    Returns:
+        dict: 'novos_entrantes', 'veteranos' and 'indice_reposicao'.
+    """
+    df_alert = alert_scope(df)
+
+    count_new_entrants = df_alert[df_alert['faixa_etaria'].isin(NEW_ENTRANTS_AGES)]['qtd_condutores'].sum()
+    count_veterans = df_alert[df_alert['faixa_etaria'].isin(VETERANS_AGES)]['qtd_condutores'].sum()
+
+    # Evita divisão por zero
+    index = count_new_entrants / count_veterans if count_veterans > 0 else 0.0
+
+    return {'novos_entrantes': int(count_new_entrants), 'veteranos': int(count_veterans), 'indice_reposicao': float(index)}
+
+
+def city_risk_table(df):
+    """Weighted mean age and risk status of the heavy drivers of each municipality.
+
+    Returns:
+        pd.DataFrame: 'descricao_municipio', 'Total_Condutores', 'Soma_Ponderada',
+                      'Idade_Media' and 'Status_Risco', oldest municipalities first.
+    """
+    df_risk = alert_scope(df)
+
+    # Cálculo Ponderado: (Idade * Qtd)
+    soma_ponderada = df_risk['faixa_etaria'].map(utils.AGE_MIDPOINTS).astype(float) * df_risk['qtd_condutores']
+
+    df_city_risk = df_risk.assign(soma_ponderada=soma_ponderada).groupby('descricao_municipio', observed=True).agg(
+        Total_Condutores=('qtd_condutores', 'sum'),
+        Soma_Ponderada=('soma_ponderada', 'sum')
+    ).reset_index()
+
+    df_city_risk['Idade_Media'] = df_city_risk['Soma_Ponderada'] / df_city_risk['Total_Condutores']
+    df_city_risk['Status_Risco'] = df_city_risk['Idade_Media'].apply(risk_status)
+
+    return df_city_risk.sort_values('Idade_Media', ascending=False)
+
+
+def blocked_rates(df):
+    """Blocked and active heavy drivers per simplified category.
+
+    Returns:
+        pd.DataFrame: Indexed by 'categoria_simple' with 'S' (blocked), 'N',
+                      'Total' and 'Pct_Block'.
+    """
+    heavy_drivers_df = df[df['categoria_cnh'].isin(utils.HEAVY_CATEGORIES)]
+    categoria_simple = heavy_drivers_df['categoria_cnh'].apply(utils.simplify_category).rename('categoria_simple')
+
+    df_block = heavy_drivers_df.groupby([categoria_simple, 'condutor_bloqueado'], observed=True)['qtd_condutores'].sum().unstack(fill_value=0)
+    df_block.columns = df_block.columns.astype(str)
+    # Ensure columns exist
+    for c in ['S', 'N']:
+        if c not in df_block.columns: df_block[c] = 0
+
+    df_block['Total'] = df_block['S'] + df_block['N']
+    df_block['Pct_Block'] = (df_block['S'] / df_block['Total']) * 100
+
+    return df_block[['S', 'N', 'Total', 'Pct_Block']]
+
+
+def hub_rankings(df):
+    """Heavy drivers per municipality split by EAR status, largest hubs first.
+
+    Returns:
+        pd.DataFrame: Indexed by 'descricao_municipio' with 'Total', 'S' (EAR) and 'N'.
+    """
+    heavy_drivers_df = df[df['categoria_cnh'].isin(utils.HEAVY_CATEGORIES)]
+
+    df_pivot = heavy_drivers_df.groupby(['descricao_municipio', 'exerce_atividade_remunerada'], observed=True)['qtd_condutores'].sum().unstack(fill_value=0)
+    df_pivot.columns = df_pivot.columns.astype(str)
+    totals = df_pivot.sum(axis=1)
+    # Ensure 'S' and 'N' columns exist
+    for col in ['S', 'N']:
+        if col not in df_pivot.columns:
+            df_pivot[col] = 0
+
+    df_pivot['Total'] = totals
+    df_pivot.index = df_pivot.index.astype(str)
+
+    return df_pivot[['Total', 'S', 'N']].sort_values('Total', ascending=False)
+
+
+def city_profile(df):
+    """Heavy-driver counts and risk metrics per municipality, summable over any group of cities.
+
+    Returns:
+        pd.DataFrame: Indexed by 'descricao_municipio' with 'Total_Condutores',
+                      'EAR', 'Novos_Entrantes', 'Veteranos', 'Soma_Ponderada',
+                      'Idade_Media' and 'Status_Risco'.
+    """
+    df_risk = alert_scope(df)
+    qtd = df_risk['qtd_condutores']
+
+    df_profile = df_risk.assign(
+        ear=qtd.where(df_risk['exerce_atividade_remunerada'] == 'S', 0),
+        novos=qtd.where(df_risk['faixa_etaria'].isin(NEW_ENTRANTS_AGES), 0),
+        veteranos=qtd.where(df_risk['faixa_etaria'].isin(VETERANS_AGES), 0),
+        soma_ponderada=df_risk['faixa_etaria'].map(utils.AGE_MIDPOINTS).astype(float) * qtd,
+    ).groupby('descricao_municipio', observed=True).agg(
+        Total_Condutores=('qtd_condutores', 'sum'),
+        EAR=('ear', 'sum'),
+        Novos_Entrantes=('novos', 'sum'),
+        Veteranos=('veteranos', 'sum'),
+        Soma_Ponderada=('soma_ponderada', 'sum'),
+    )
+
+    df_profile['Idade_Media'] = df_profile['Soma_Ponderada'] / df_profile['Total_Condutores']
+    df_profile['Status_Risco'] = df_profile['Idade_Media'].apply(risk_status)
+    df_profile.index = df_profile.index.astype(str)
+
+    return df_profile
+
+
+def _age_by_ear(df):
+    df_age = df.groupby(['faixa_etaria', 'exerce_atividade_remunerada'], observed=True)['qtd_condutores'].sum().unstack(fill_value=0)
+    for c in ['S', 'N']:
+        if c not in df_age.columns: df_age[c] = 0
+    return df_age
+
+
+def heavy_overview(df):
+    """Every number and table of the "Panorama Geral" page that depends only on the dataset.
+
+    Heavy categories are `utils.HEAVY_CATEGORIES`. The women and PCD tables
+    are None when the dataset lacks the column, and empty when nobody matches.
+
+    Returns:
+        dict: 'total', 'ear' and 'bloqueados' (heavy drivers), plus the tables
+              'faixas' (per age band, largest first), 'bloqueio' (`blocked_rates`),
+              'bloqueados_faixa', 'categorias', 'ear_categoria', 'distribuicao_etaria',
+              'mulheres_categoria', 'mulheres_faixa', 'pcd_genero', 'pcd_categoria'
+              and 'pcd_faixa'.
+    """
+    heavy_drivers_df = df[df['categoria_cnh'].isin(utils.HEAVY_CATEGORIES)].copy()
+    heavy_drivers_df['categoria_simple'] = heavy_drivers_df['categoria_cnh'].apply(utils.simplify_category)
+
+    blocked_df = heavy_drivers_df[heavy_drivers_df['condutor_bloqueado'] == 'S']
+    ear_df = heavy_drivers_df[heavy_drivers_df['exerce_atividade_remunerada'] == 'S']
+
+    overview = {
+        'total': heavy_drivers_df['qtd_condutores'].sum(),
+        'ear': ear_df['qtd_condutores'].sum(),
+        'bloqueados': blocked_df['qtd_condutores'].sum(),
+        'faixas': heavy_drivers_df.groupby('faixa_etaria', observed=True)['qtd_condutores'].sum().sort_values(ascending=False),
+        'bloqueio': blocked_rates(df),
+        'bloqueados_faixa': blocked_df.groupby('faixa_etaria', observed=True)['qtd_condutores'].sum().reset_index(),
+        'categorias': heavy_drivers_df.groupby('categoria_simple', observed=True)['qtd_condutores'].sum().reset_index(),
+        'ear_categoria': heavy_drivers_df.groupby(['categoria_simple', 'exerce_atividade_remunerada'], observed=True)['qtd_condutores'].sum().unstack(fill_value=0),
+        'distribuicao_etaria': heavy_drivers_df.groupby('faixa_etaria', observed=True)['qtd_condutores'].sum().reset_index(),
+        'mulheres_categoria': None, 'mulheres_faixa': None,
+        'pcd_genero': None, 'pcd_categoria': None, 'pcd_faixa': None,
+    }
+
+    if 'genero' in heavy_drivers_df.columns:
+        women_df = heavy_drivers_df[heavy_drivers_df['genero'].isin(segments.WOMEN)]
+        overview['mulheres_categoria'] = women_df.groupby('categoria_simple', observed=True)['qtd_condutores'].sum().reset_index()
+        overview['mulheres_faixa'] = _age_by_ear(women_df)
+
+    if 'pessoa_com_deficiencia' in heavy_drivers_df.columns:
+        pcd_df = heavy_drivers_df[heavy_drivers_df['pessoa_com_deficiencia'] == 'S']
+        if 'genero' in pcd_df.columns:
+            overview['pcd_genero'] = pcd_df.groupby('genero', observed=True)['qtd_condutores'].sum().reset_index()
+        overview['pcd_categoria'] = pcd_df.groupby('categoria_simple', observed=True)['qtd_condutores'].sum().reset_index()
+        overview['pcd_faixa'] = _age_by_ear(pcd_df)
+
+    return overview
+
+
+def ear_by_age(df, city=None, categories=('C', 'D', 'E')):
+    """Heavy drivers per age band and EAR status, as the "Apagão" EAR chart filters them.
+
+    Args:
+        df (pd.DataFrame): The dataset.
+        city (str, optional): Only this municipality. Defaults to the whole state.
+        categories (tuple): Simplified categories to keep ('C', 'D' and/or 'E').
+
+    Returns:
+        pd.DataFrame: 'faixa_etaria', 'exerce_atividade_remunerada' and
+                      'qtd_condutores'; empty if nothing matches.
+    """
+    df_filtered = alert_scope(df)
+    if city is not None:
+        df_filtered = df_filtered[df_filtered['descricao_municipio'] == city]
+    df_filtered = df_filtered[df_filtered['categoria_cnh'].map(utils.simplify_category).isin(categories)]
+
+    return df_filtered.groupby(['faixa_etaria', 'exerce_atividade_remunerada'], observed=True)['qtd_condutores'].sum().reset_index()
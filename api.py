@@ -0,0 +1,170 @@
+"""Read-only HTTP API serving the dashboard aggregates as JSON or Parquet.
+
+Aggregates are computed once per dataset version through the same
+`utils.read_compacted` pipeline the app uses and kept serialized in memory.
+Responses carry an ETag derived from the dataset version, so polling clients
+that send `If-None-Match` get an empty 304 until a new snapshot is published.
+
+Usage:
+
+    python api.py [--port 8502] [--data condutores_habilitados_ativos_incrementado.csv]
+
+Endpoints (append `?format=parquet` for Parquet):
+
+    /api                      available endpoints and dataset version
+    /api/replacement-index    statewide replacement index
+    /api/city-risk            mean age and risk status per municipality
+    /api/blocked-rates        blocked drivers per category
+    /api/hubs                 heavy drivers per municipality, largest first
+"""
+import argparse
+import asyncio
+import io
+
+import pandas as pd
+import tornado.web
+
+import aggregates
+import utils
+
+ENDPOINTS = {
+    'replacement-index': lambda df: pd.DataFrame([aggregates.replacement_index(df)]),
+    'city-risk': lambda df: aggregates.city_risk_table(df).drop(columns='Soma_Ponderada'),
+    'blocked-rates': lambda df: aggregates.blocked_rates(df).reset_index(),
+    'hubs': lambda df: aggregates.hub_rankings(df).reset_index(),
+}
+
+CONTENT_TYPES = {
+    'json': 'application/json; charset=UTF-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def build_payloads(path):
+    """Computes every endpoint for the current file and serializes it in each format.
+
+    Returns:
+        tuple: The dataset version and a dict {endpoint: {format: bytes}}.
+    """
+    version = utils.dataset_version(path)
+    df = utils.read_compacted(path)[0]
+
+    payloads = {}
+    for name, compute in ENDPOINTS.items():
+        table = compute(df)
+        records = table.to_json(orient='records', force_ascii=False)
+
+        parquet = io.BytesIO()
+        table.to_parquet(parquet, index=False)
+
+        payloads[name] = {
+            'json': f'{{"version": "{version}", "data": {records}}}'.encode('utf-8'),
+            'parquet': parquet.getvalue(),
+        }
+
+    return version, payloads
+
+
+class AggregateStore:
+    """Holds the serialized aggregates of the latest dataset version.
+
+    A change in the file's version triggers one rebuild in a worker thread;
+    requests arriving meanwhile await the same build instead of starting their own.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self.payloads = {}
+        self._build = None
+        self._build_version = None
+
+    async def get(self):
+        version = utils.dataset_version(self.path)
+        if version == self.version:
+            return self.version, self.payloads
+
+        if self._build is None or self._build_version != version:
+            self._build_version = version
+            self._build = asyncio.get_running_loop().run_in_executor(None, build_payloads, self.path)
+
+        try:
+            self.version, self.payloads = await self._build
+        except Exception:
+            # Let the next request retry instead of replaying the failure
+            self._build = None
+            raise
+        return self.version, self.payloads
+
+
+class IndexHandler(tornado.web.RequestHandler):
+    def initialize(self, store):
+        self.store = store
+
+    async def get(self):
+        version, _ = await self.store.get()
+        self.write({'version': version, 'endpoints': [f'/api/{name}' for name in ENDPOINTS]})
+
+
+class AggregateHandler(tornado.web.RequestHandler):
+    def initialize(self, store):
+        self.store = store
+        self._etag = None
+
+    def compute_etag(self):
+        return self._etag
+
+    async def get(self, name):
+        if name not in ENDPOINTS:
+            raise tornado.web.HTTPError(404)
+
+        output_format = self.get_query_argument('format', 'json')
+        if output_format not in CONTENT_TYPES:
+            raise tornado.web.HTTPError(400, f'Unknown format {output_format!r}')
+
+        version, payloads = await self.store.get()
+
+        self._etag = f'"{version}-{name}-{output_format}"'
+        self.set_etag_header()
+        # Clients may keep the response but must revalidate it
+        self.set_header('Cache-Control', 'no-cache')
+        self.set_header('Content-Type', CONTENT_TYPES[output_format])
+
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+
+        self.write(payloads[name][output_format])
+
+
+def make_app(path=utils.DATA_PATH):
+    store = AggregateStore(path)
+    return tornado.web.Application(
+        [
+            (r'/api/?', IndexHandler, {'store': store}),
+            (r'/api/([a-z-]+)', AggregateHandler, {'store': store}),
+        ],
+        compress_response=True,
+    ), store
+
+
+async def serve(port, path):
+    app, store = make_app(path)
+    # Warm up before accepting connections
+    await store.get()
+    app.listen(port)
+    print(f'API servindo a versão {store.version} em http://localhost:{port}/api')
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves the dashboard aggregates over HTTP.')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--data', default=utils.DATA_PATH, help=f'Dataset CSV (default: {utils.DATA_PATH})')
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.port, args.data))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Compares the legacy `pd.read_csv` ingest with `utils.read_dataset`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_load_data [path] [--repeat N] [--files GLOB]
+
+With --files, also compares loading every matching file one after the
+other with the concurrent `utils.read_files`.
+"""
+import glob
+import argparse
+import time
+
+import pandas as pd
+
+import utils
+
+DASHBOARD_COLUMNS = utils.DIMENSION_COLUMNS + ['qtd_condutores', 'lat', 'lon']
+
+
+def legacy_load(path):
+    """The original ingest: single-threaded parse with type inference and a row-wise apply."""
+    df = pd.read_csv(path, sep=',')
+    df = df[~df['faixa_etaria'].isin(utils.INVALID_AGE_GROUPS)]
+    df['tipo_atuacao'] = df.apply(utils.classify_profile, axis=1)
+    return df
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), df.memory_usage(deep=True).sum() / 1024**2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', nargs='?', default=utils.DATA_PATH)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--files', help='Glob of several extracts for the multi-file comparison')
+    args = parser.parse_args()
+
+    scenarios = {
+        'pd.read_csv (legado)': lambda: legacy_load(args.path),
+        'read_dataset (todas as colunas)': lambda: utils.read_dataset(args.path),
+        'read_dataset (colunas do painel)': lambda: utils.read_dataset(args.path, DASHBOARD_COLUMNS),
+        'read_compacted (painel)': lambda: utils.read_compacted(args.path)[0],
+    }
+    if args.files:
+        paths = sorted(glob.glob(args.files))
+        scenarios[f'{len(paths)} arquivos em sequência'] = lambda: pd.concat([utils.read_compacted(path)[0] for path in paths])
+        scenarios[f'{len(paths)} arquivos com read_files'] = lambda: utils.read_files(paths)[0]
+
+    baseline = None
+    print(f'{"Cenário":<36}{"Tempo (s)":>12}{"Memória (MB)":>15}{"Speedup":>10}')
+    for name, fn in scenarios.items():
+        elapsed, memory = measure(fn, args.repeat)
+        baseline = baseline or elapsed
+        print(f'{name:<36}{elapsed:>12.3f}{memory:>15.1f}{baseline / elapsed:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Concurrent-session load test of the dashboard pages.
+
+Drives the real page scripts through Streamlit's headless testing API
+(`streamlit.testing.v1.AppTest`). Each scenario runs in its own process, where
+N sessions interact with the page concurrently; every rerun is timed, and the
+process' peak RSS, the peak combined RSS of its worker processes (`workers`)
+and the shared computations coalesced across sessions (`utils.coalescing_stats`)
+are recorded.
+
+Usage (from the repository root, next to the dataset):
+
+    python -m benchmarks.loadtest_pages [--sessions 8] [--iterations 5] [--scenario overview ...]
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from unittest.mock import MagicMock
+
+import numpy as np
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+
+import utils
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous, the first run of a cold process parses the dataset
+TIMEOUT = 300
+
+
+def share_runtime():
+    """Lets several AppTest sessions run at once in the same process, as on a server.
+
+    AppTest installs a mock `Runtime` singleton for each run and clears it when
+    the run ends, which breaks any other session still running; falling back
+    to one shared mock keeps them all alive. Each AppTest also compiles the
+    page with its own script cache, and concurrent compiles can crash CPython's
+    parser, so bytecode is shared process-wide like the server's script cache.
+    """
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    get_bytecode = ScriptCache.get_bytecode
+    bytecode = {}
+    lock = threading.Lock()
+
+    def shared_get_bytecode(self, script_path):
+        with lock:
+            if script_path not in bytecode:
+                bytecode[script_path] = get_bytecode(self, script_path)
+            return bytecode[script_path]
+
+    ScriptCache.get_bytecode = shared_get_bytecode
+
+
+def children_rss_mb():
+    """Combined current RSS of this process' children (the worker processes), in MB (Linux)."""
+    total = 0
+    for stat in glob.glob('/proc/[0-9]*/stat'):
+        try:
+            with open(stat) as f:
+                # Fields after the command name: state, ppid, ..., rss (in pages) at index 21
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            # Exited while listing
+            continue
+        if int(fields[1]) == os.getpid():
+            total += int(fields[21])
+    return total * os.sysconf('SC_PAGE_SIZE') / 1024**2
+
+
+def sample_peak(measure, stop, interval=0.1):
+    """Calls `measure` every `interval` seconds until `stop` is set; returns the largest value."""
+    peak = measure()
+    while not stop.wait(interval):
+        peak = max(peak, measure())
+    return peak
+
+
+def toggle(index):
+    def interact(at, rng):
+        widget = at.toggle[index]
+        return widget.set_value(not widget.value)
+    return interact
+
+
+def pick_city(at, rng):
+    widget = at.selectbox(key='ear_city_filter')
+    return widget.set_value(rng.choice(widget.options))
+
+
+def compare_cities(at, rng):
+    if not at.toggle[0].value:
+        at = at.toggle[0].set_value(True).run()
+    widget = [ms for ms in at.multiselect if ms.key != 'ear_category_filter'][0]
+    return widget.set_value(rng.sample(widget.options, 3))
+
+
+def move_slider(index):
+    def interact(at, rng):
+        widget = at.slider[index]
+        return widget.set_value(rng.randint(widget.min, widget.max))
+    return interact
+
+
+def no_op(at, rng):
+    return at
+
+
+# Scenario name -> (page script, interactions performed in each iteration)
+SCENARIOS = {
+    'overview': ('pages/Overview.py', [toggle(0)]),
+    'blackout-city': ('pages/LogisticsBlackout.py', [pick_city]),
+    'blackout-compare': ('pages/LogisticsBlackout.py', [compare_cities]),
+    'about': ('pages/About_Data.py', [no_op]),
+    'projection': ('pages/Projection.py', [move_slider(0), move_slider(1)]),
+}
+
+
+def run_session(page, interactions, iterations, seed):
+    """One user session: opens the page, then repeats the interactions.
+
+    Returns:
+        tuple: Rerun latencies in seconds and the number of reruns that raised.
+    """
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=TIMEOUT)
+    start = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - start)
+
+    for _ in range(iterations):
+        for interact in interactions:
+            start = time.perf_counter()
+            try:
+                at = interact(at, rng).run()
+            except Exception:
+                # Widget missing after a failed rerun, or the rerun timed out
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            errors += len(at.exception)
+
+    return latencies, errors
+
+
+def run_scenario(name, sessions, iterations):
+    """Runs one scenario with `sessions` concurrent sessions (meant for a fresh process)."""
+    page, interactions = SCENARIOS[name]
+    share_runtime()
+
+    # The workers hold their own copy of the heavy rows, outside this process' RSS
+    stop = threading.Event()
+    sampler = ThreadPoolExecutor(max_workers=1)
+    workers_peak = sampler.submit(sample_peak, children_rss_mb, stop)
+
+    # Warm-up: fill the caches so the numbers reflect steady-state reruns
+    run_session(page, [], 0, seed=0)
+
+    flights = utils.coalescing_stats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda seed: run_session(page, interactions, iterations, seed), range(1, sessions + 1)))
+    elapsed = time.perf_counter() - start
+    coalesced = utils.coalescing_stats()['coalesced'] - flights['coalesced']
+    stop.set()
+    sampler.shutdown()
+
+    latencies = np.concatenate([session_latencies for session_latencies, _ in results]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+
+    return {
+        'scenario': name,
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'errors': sum(errors for _, errors in results),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'reruns_per_s': len(latencies) / elapsed,
+        'coalesced': coalesced,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_workers_rss_mb': workers_peak.result(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures rerun latency of the pages under concurrent sessions.')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 8], help='Concurrent sessions (one run per value)')
+    parser.add_argument('--iterations', type=int, default=5, help='Interaction rounds per session')
+    parser.add_argument('--scenario', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = []
+    print(f'{"Cenário":<18}{"Sessões":>8}{"Reruns":>8}{"Erros":>7}{"p50 (ms)":>10}{"p95 (ms)":>10}{"p99 (ms)":>10}{"Reruns/s":>10}{"RSS (MB)":>10}{"Workers (MB)":>14}{"Coalesc.":>10}')
+    for name in args.scenario:
+        for sessions in args.sessions:
+            # A fresh process per run keeps caches and peak RSS isolated
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                result = pool.submit(run_scenario, name, sessions, args.iterations).result()
+            results.append(result)
+            print(
+                f'{name:<18}{sessions:>8}{result["reruns"]:>8}{result["errors"]:>7}'
+                f'{result["p50_ms"]:>10.0f}{result["p95_ms"]:>10.0f}{result["p99_ms"]:>10.0f}'
+                f'{result["reruns_per_s"]:>10.1f}{result["peak_rss_mb"]:>10.0f}{result["peak_workers_rss_mb"]:>14.0f}{result["coalesced"]:>10}'
+            )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
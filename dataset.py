@@ -0,0 +1,224 @@
+"""Double-buffered dataset that can be replaced while the app is serving.
+
+`DatasetManager` keeps the current `Snapshot` (one parsed version of the data
+file plus the aggregates derived from it) and polls the file in the
+background. When a new version shows up it is parsed, and every registered
+derivation computed, on a single worker thread while sessions keep reading the
+current snapshot; only then is the reference swapped. Nothing is mutated in
+place, so a rerun holding the old snapshot finishes on it, and the old
+version is garbage collected once the last rerun drops it.
+
+Derived aggregates go through `SingleFlight`: when several sessions ask for
+the same missing aggregate at once, one computes it and the others wait for
+that result instead of each starting their own.
+"""
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time.
+
+    The first caller for a key computes; callers arriving while it runs wait
+    for its result (or its exception) and are counted as coalesced. Nothing is
+    kept once the computation finishes, so callers cache the result themselves.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        """`compute()`, or the result of the identical call already running for `key`."""
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = compute()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._in_flight)}
+
+
+# Shared by every snapshot, so the counters cover the whole process
+flights = SingleFlight()
+
+
+class Snapshot:
+    """One immutable version of the dataset.
+
+    Attributes:
+        version (str): Token identifying the source file version.
+        facts (pd.DataFrame): Compacted facts.
+        municipalities (pd.DataFrame): Per-municipality side table.
+        stats (dict): Compaction statistics.
+        loaded_at (float): Epoch seconds when the build finished.
+    """
+
+    def __init__(self, version, facts, municipalities, stats):
+        self.version = version
+        self.facts = facts
+        self.municipalities = municipalities
+        self.stats = stats
+        self.loaded_at = time.time()
+        self._derived = {}
+
+    def derived(self, name, compute):
+        """Result of `compute(self)`, computed once per snapshot and shared; treat it as read-only.
+
+        Different aggregates are computed concurrently; concurrent requests
+        for the same one share a single computation.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+
+        def compute_once():
+            # A flight for `name` may have finished between the lookup above and this one
+            if name not in self._derived:
+                self._derived[name] = compute(self)
+            return self._derived[name]
+
+        return flights.do((self, name), compute_once)
+
+
+class DatasetManager:
+    """Serves the current snapshot and rebuilds it when the source file changes.
+
+    Args:
+        path (str): Data file to watch.
+        build (callable): `build(path)` -> (facts, municipalities, stats).
+        version (callable): `version(path)` -> token that changes with the file.
+        interval (float): Seconds between checks of the file.
+    """
+
+    def __init__(self, path, build, version, interval=30):
+        self.path = path
+        self.interval = interval
+        self.last_error = None
+        self._failed_version = None
+        self._build = build
+        self._version = version
+        self._current = None
+        self._pending = None
+        self._on_swap = []
+        self._derivations = {}
+        self._lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dataset-build')
+        self._stop = threading.Event()
+        # Versions still referenced by someone, to check that old ones are released
+        self._alive = weakref.WeakValueDictionary()
+
+    def current(self):
+        """The live snapshot; the first call builds it synchronously."""
+        snapshot = self._current
+        if snapshot is None:
+            with self._lock:
+                if self._current is None:
+                    self._swap(self._make_snapshot(self._version(self.path)))
+                snapshot = self._current
+        return snapshot
+
+    def register(self, name, compute):
+        """Declares a derived aggregate, precomputed for every future snapshot before it goes live."""
+        self._derivations[name] = compute
+
+    def on_swap(self, callback):
+        """Calls `callback(old, new)` right after a new snapshot goes live."""
+        self._on_swap.append(callback)
+
+    def refresh(self):
+        """Starts a background rebuild if the file changed; returns the build future, if any."""
+        with self._lock:
+            if self._current is None or self._pending is not None:
+                return self._pending
+            try:
+                version = self._version(self.path)
+            except OSError as error:
+                # The file is being replaced; try again on the next check
+                self.last_error = error
+                return None
+            if version in (self._current.version, self._failed_version):
+                return None
+            self._pending = self._worker.submit(self._rebuild, version)
+            return self._pending
+
+    def start(self):
+        """Checks the file every `interval` seconds on a daemon thread."""
+        threading.Thread(target=self._poll, name='dataset-poll', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._worker.shutdown(wait=True)
+
+    def alive_versions(self):
+        """Versions of every snapshot that is still referenced, live one included."""
+        return sorted(self._alive.keys())
+
+    def building(self):
+        return self._pending is not None
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def _make_snapshot(self, version):
+        snapshot = Snapshot(version, *self._build(self.path))
+        for name, compute in list(self._derivations.items()):
+            snapshot.derived(name, compute)
+        return snapshot
+
+    def _rebuild(self, version):
+        start = time.perf_counter()
+        try:
+            snapshot = self._make_snapshot(version)
+        except Exception as error:
+            # Keep serving the current version until the file changes again
+            logger.exception('Failed to build dataset version %s', version)
+            with self._lock:
+                self.last_error = error
+                self._failed_version = version
+                self._pending = None
+            return None
+
+        with self._lock:
+            old = self._current
+            self._swap(snapshot)
+            self._pending = None
+        logger.info('Dataset version %s live after %.1fs (was %s)', version, time.perf_counter() - start, old.version)
+        for callback in self._on_swap:
+            callback(old, snapshot)
+        return snapshot
+
+    def _swap(self, snapshot):
+        self._current = snapshot
+        self._alive[snapshot.version] = snapshot
+        self.last_error = None
+        self._failed_version = None
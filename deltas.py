@@ -0,0 +1,134 @@
+"""Month-over-month changes between two snapshots of the dataset.
+
+Both snapshots are reduced to one int64 key per row, packed from the
+category codes of every dimension (as in `utils.compact`). Both key sets
+are merged in a single sort, each side's counts are scattered onto the
+merged keys, and the result has the counts before and after for every dimension
+tuple present in either month. String columns are never compared.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.csv as pacsv
+
+import aggregates
+import utils
+
+# Where previous monthly extracts are kept, next to the current dataset
+HISTORY_GLOB = 'historico/*.csv'
+
+
+def reference_month(path):
+    """(ano_ref, mes_ref) of an extract, read from its first rows only; None if absent."""
+    try:
+        reader = pacsv.open_csv(path, convert_options=pacsv.ConvertOptions(include_columns=['ano_ref', 'mes_ref']))
+        batch = reader.read_next_batch()
+    except (KeyError, StopIteration, ValueError):
+        return None
+    return int(batch.column('ano_ref')[0].as_py()), int(batch.column('mes_ref')[0].as_py())
+
+
+def available_snapshots(history_glob=HISTORY_GLOB, current=utils.DATA_PATH):
+    """Extracts that can be compared, oldest first.
+
+    Returns:
+        list: (path, (ano_ref, mes_ref)) for the files in `history_glob` and
+              the current dataset, skipping files without a reference month.
+    """
+    paths = set(glob.glob(history_glob))
+    if os.path.exists(current):
+        paths.add(current)
+    snapshots = [(path, month) for path in paths if (month := reference_month(path)) is not None]
+    return sorted(snapshots, key=lambda item: (item[1], item[0]))
+
+
+def _align_categories(before, after, dims):
+    """Gives both snapshots the same categories per dimension, so codes are comparable."""
+    before, after = before.copy(deep=False), after.copy(deep=False)
+    for col in dims:
+        if not before[col].cat.categories.equals(after[col].cat.categories):
+            categories = sorted(set(before[col].cat.categories) | set(after[col].cat.categories))
+            before[col] = before[col].cat.set_categories(categories)
+            after[col] = after[col].cat.set_categories(categories)
+    return before, after
+
+
+def _keys(df, dims, shape):
+    # Shifted by one so missing values (-1) get their own code
+    return np.ravel_multi_index([df[col].cat.codes.to_numpy() + 1 for col in dims], shape)
+
+
+def diff(before, after, dims=utils.DIMENSION_COLUMNS):
+    """Aligns two snapshots on the full dimension key.
+
+    Args:
+        before (pd.DataFrame): Earlier snapshot with categorical `dims` and 'qtd_condutores'.
+        after (pd.DataFrame): Later snapshot, same layout.
+        dims (list): Dimension columns that form the key.
+
+    Returns:
+        pd.DataFrame: One row per dimension tuple present in either snapshot,
+                      with `dims`, 'antes', 'depois' and 'variacao'.
+    """
+    before, after = _align_categories(before, after, dims)
+    categories = [before[col].cat.categories for col in dims]
+    shape = tuple(len(cats) + 1 for cats in categories)
+
+    keys_before = _keys(before, dims, shape)
+    keys_after = _keys(after, dims, shape)
+
+    # One sort over both key sets gives the merged keys and every row's slot in them
+    keys, slots = np.unique(np.concatenate([keys_before, keys_after]), return_inverse=True)
+    split = len(keys_before)
+    antes = np.bincount(slots[:split], weights=before['qtd_condutores'].to_numpy(), minlength=len(keys))
+    depois = np.bincount(slots[split:], weights=after['qtd_condutores'].to_numpy(), minlength=len(keys))
+
+    codes = np.unravel_index(keys, shape)
+    delta = pd.DataFrame({
+        col: pd.Categorical.from_codes(col_codes - 1, categories=cats)
+        for col, col_codes, cats in zip(dims, codes, categories)
+    })
+    delta['antes'] = antes.astype('int64')
+    delta['depois'] = depois.astype('int64')
+    delta['variacao'] = delta['depois'] - delta['antes']
+    return delta
+
+
+def by_dimension(delta, dims):
+    """Changes summed over `dims`, with the growth rate.
+
+    Returns:
+        pd.DataFrame: Indexed by `dims` with 'antes', 'depois', 'variacao' and
+                      'crescimento_pct' (NaN where there was nothing before).
+    """
+    table = delta.groupby(dims, observed=True)[['antes', 'depois', 'variacao']].sum()
+    table['crescimento_pct'] = table['variacao'] / table['antes'].where(table['antes'] > 0) * 100
+    return table
+
+
+def movers(table, n=10):
+    """The `n` largest drops and the `n` largest rises of a `by_dimension` table."""
+    return {
+        'quedas': table[table['variacao'] < 0].nsmallest(n, 'variacao'),
+        'altas': table[table['variacao'] > 0].nlargest(n, 'variacao'),
+    }
+
+
+def heavy_summary(delta):
+    """Heavy drivers, blocked heavy drivers and replacement index before and after.
+
+    Returns:
+        dict: {metric: (before, after)} for 'pesados', 'bloqueados' and 'indice_reposicao'.
+    """
+    heavy = delta[delta['categoria_cnh'].isin(utils.HEAVY_CATEGORIES)]
+    blocked = heavy[heavy['condutor_bloqueado'] == 'S']
+    return {
+        'pesados': (int(heavy['antes'].sum()), int(heavy['depois'].sum())),
+        'bloqueados': (int(blocked['antes'].sum()), int(blocked['depois'].sum())),
+        'indice_reposicao': tuple(
+            aggregates.replacement_index(delta.assign(qtd_condutores=delta[side]))['indice_reposicao']
+            for side in ('antes', 'depois')
+        ),
+    }
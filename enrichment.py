@@ -0,0 +1,114 @@
+"""Geo-enrichment of raw Detran extracts.
+
+Joins a raw monthly extract with a local municipality reference table on
+`codigo_ibge`, producing the `..._incrementado.csv` layout the dashboard reads.
+
+Usage:
+
+    python enrichment.py raw.csv municipios_sp.csv -o condutores_habilitados_ativos_incrementado.csv
+"""
+import argparse
+import time
+
+import pandas as pd
+
+import utils
+
+# Columns taken from the reference table, in output order
+REFERENCE_COLUMNS = ['descricao_municipio', 'lat', 'lon', 'regiao']
+
+# Municipality name of the rows whose IBGE code is not in the reference table
+UNIDENTIFIED = 'Não identificado'
+
+
+def load_reference(path):
+    """Loads the municipality reference table (IBGE code -> name, lat, lon, region).
+
+    Args:
+        path (str): CSV with a 'codigo_ibge' column plus any of `REFERENCE_COLUMNS`.
+
+    Returns:
+        pd.DataFrame: The reference table indexed by 'codigo_ibge'.
+
+    Raises:
+        ValueError: If the table has no 'codigo_ibge' column or repeats a code.
+    """
+    ref = pd.read_csv(path, sep=',')
+
+    if 'codigo_ibge' not in ref.columns:
+        raise ValueError(f"Reference table {path} has no 'codigo_ibge' column")
+
+    duplicated = ref.loc[ref['codigo_ibge'].duplicated(), 'codigo_ibge'].unique()
+    if len(duplicated):
+        raise ValueError(f'Reference table {path} repeats IBGE codes: {sorted(duplicated)}')
+
+    return ref.set_index('codigo_ibge')[[col for col in REFERENCE_COLUMNS if col in ref.columns]]
+
+
+def enrich(raw_df, reference):
+    """Attaches the reference attributes to every row of a raw extract.
+
+    The join is a single hash lookup of each row's `codigo_ibge` against the
+    reference index; the attribute columns are then gathered by position.
+
+    Args:
+        raw_df (pd.DataFrame): Raw Detran extract with a 'codigo_ibge' column.
+        reference (pd.DataFrame): Output of `load_reference`.
+
+    Returns:
+        tuple: The enriched frame, where unmatched rows have no coordinates and
+               are named `UNIDENTIFIED`, and a frame with the unmatched codes,
+               their number of rows and of drivers.
+    """
+    positions = reference.index.get_indexer(raw_df['codigo_ibge'])
+    matched = positions >= 0
+
+    enriched = raw_df.copy()
+    for col in reference.columns:
+        # The extract's own municipality names win when it has them
+        if col in enriched.columns:
+            continue
+        values = pd.Series(reference[col].to_numpy()[positions], index=enriched.index).where(matched)
+        if col == 'descricao_municipio':
+            # Named explicitly, so the pages don't list a municipality called ""
+            values = values.fillna(UNIDENTIFIED)
+        enriched[col] = values
+
+    unmatched = (
+        raw_df.loc[~matched]
+        .groupby('codigo_ibge')
+        .agg(linhas=('codigo_ibge', 'size'), qtd_condutores=('qtd_condutores', 'sum'))
+        .reset_index()
+    )
+
+    return enriched, unmatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Adds municipality coordinates to a raw Detran extract.')
+    parser.add_argument('raw', help='Raw Detran CSV')
+    parser.add_argument('reference', help='Municipality reference table (codigo_ibge, descricao_municipio, lat, lon, regiao)')
+    parser.add_argument('-o', '--output', default=utils.DATA_PATH, help=f'Enriched CSV (default: {utils.DATA_PATH})')
+    args = parser.parse_args()
+
+    raw_df = utils.parse_csv(args.raw)
+    reference = load_reference(args.reference)
+
+    start = time.perf_counter()
+    enriched, unmatched = enrich(raw_df, reference)
+    elapsed = time.perf_counter() - start
+
+    print(f'{len(raw_df):,} linhas, {raw_df["codigo_ibge"].nunique()} municípios, junção em {elapsed * 1000:.1f} ms')
+
+    if unmatched.empty:
+        print('Todos os códigos IBGE foram encontrados na tabela de referência.')
+    else:
+        print(f'{len(unmatched)} códigos IBGE sem correspondência ({unmatched["qtd_condutores"].sum():,} condutores):')
+        print(unmatched.to_string(index=False))
+
+    enriched.to_csv(args.output, index=False)
+    print(f'Arquivo enriquecido salvo em {args.output}')
+
+
+if __name__ == '__main__':
+    main()
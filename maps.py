@@ -0,0 +1,75 @@
+"""Marker and heatmap data of the page maps.
+
+Building the per-city markers walks every municipality, so it is done once
+per dataset version in a worker process (`workers.offload`) instead of in
+the script thread on every rerun. The pages only add the finished markers
+(position, size, color and texts) to a new folium map.
+"""
+import branca.colormap as cm
+import numpy as np
+
+import aggregates
+import utils
+
+# Mean-age color scale of the "Apagão" risk map: green (<40) -> yellow (45) -> red (>50)
+RISK_COLORS = dict(
+    colors=['#00FF00', '#FFFF00', '#FF0000'],
+    index=[40, 45, 50],
+    vmin=40,
+    vmax=50,
+    caption='Idade Média dos Motoristas (Anos)',
+)
+
+# Municipalities with fewer heavy drivers are left off the risk map
+MIN_RISK_MARKER_DRIVERS = 50
+
+
+def risk_colormap():
+    return cm.LinearColormap(**RISK_COLORS)
+
+
+def risk_markers(df, coordinates):
+    """Circle markers of the "Apagão" risk map, oldest municipalities first.
+
+    Args:
+        df (pd.DataFrame): Heavy drivers of the dataset (`workers.worker_input`).
+        coordinates (pd.DataFrame): 'lat' and 'lon' indexed by municipality.
+
+    Returns:
+        list: One dict per municipality with more than `MIN_RISK_MARKER_DRIVERS`
+              heavy drivers and known coordinates: 'lat', 'lon', 'radius',
+              'color', 'popup' (HTML) and 'tooltip'.
+    """
+    df_city_age = aggregates.city_risk_table(df).join(coordinates, on='descricao_municipio').dropna(subset=['lat', 'lon'])
+    df_city_age = df_city_age[df_city_age['Total_Condutores'] > MIN_RISK_MARKER_DRIVERS]
+    colormap = risk_colormap()
+
+    return [
+        {
+            'lat': row.lat,
+            'lon': row.lon,
+            # Size: Log to control visual scale
+            'radius': np.log1p(row.Total_Condutores) * 1.8,
+            'color': colormap(row.Idade_Media),
+            'popup': f"""
+                <b>{row.descricao_municipio}</b><br>
+                Frota Pesada: {int(row.Total_Condutores):,}<br>
+                Idade Média: {row.Idade_Media:.1f} anos
+            """,
+            'tooltip': f'{row.descricao_municipio}: {row.Idade_Media:.1f} anos (média)',
+        }
+        for row in df_city_age.itertuples(index=False)
+    ]
+
+
+def ear_heat_points(df, coordinates):
+    """[lat, lon, weight] of the "Panorama Geral" heatmap, weighted by log(1 + EAR heavy drivers).
+
+    Args:
+        df (pd.DataFrame): Heavy drivers of the dataset (`workers.worker_input`).
+        coordinates (pd.DataFrame): 'lat' and 'lon' indexed by municipality.
+    """
+    ear_df = df[df['categoria_cnh'].isin(utils.HEAVY_CATEGORIES) & (df['exerce_atividade_remunerada'] == 'S')]
+    ear_city = ear_df.groupby('descricao_municipio', observed=True)['qtd_condutores'].sum().reset_index()
+    ear_city = ear_city.join(coordinates, on='descricao_municipio').dropna(subset=['lat', 'lon'])
+    return [[row.lat, row.lon, np.log1p(row.qtd_condutores)] for row in ear_city.itertuples(index=False)]
@@ -21,7 +21,7 @@ def main():
     """)
 
     # Load data using your existing utility
-    df = utils.load_data()
+    df = utils.load_data(compact=False)
 
     st.divider()
 
@@ -54,6 +54,33 @@ def main():
     # 3. Preview and Download
     st.subheader("Acesso aos Dados")
     
+    stats = utils.compaction_stats()
+    st.caption(
+        f"Para os painéis, as {stats['linhas_originais']:,} linhas do arquivo são agregadas em "
+        f"{stats['linhas_compactadas']:,} combinações únicas de município, categoria, faixa etária, gênero, "
+        f"PCD, EAR e bloqueio (compactação de {stats['razao_compactacao']:.1f}x)."
+    )
+
+    info = utils.dataset_info()
+    st.caption(
+        f"Versão dos dados: `{info['versao']}`, em uso desde {info['carregado_em']:%d/%m/%Y %H:%M} (UTC)."
+        + (" Uma nova versão está sendo carregada." if info['atualizando'] else "")
+    )
+
+    flights = utils.coalescing_stats()
+    st.caption(
+        f"Agregados compartilhados entre sessões: {flights['calls']:,} pedidos desde o início do servidor, "
+        f"{flights['coalesced']:,} atendidos por um cálculo idêntico já em andamento."
+    )
+
+    if df is None:
+        st.info(
+            "O dataset está sendo substituído: o arquivo já mudou, mas a nova versão ainda não está em uso "
+            "nos painéis. A visualização e o download do arquivo completo voltam quando ela entrar em uso; "
+            "recarregue a página em instantes."
+        )
+        return
+
     st.write("Visualização das primeiras 10 linhas do dataset processado:")
     st.dataframe(df.head(10), use_container_width=True)
 
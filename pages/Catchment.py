@@ -0,0 +1,124 @@
+import time
+
+import streamlit as st
+import folium
+import branca.colormap as cm
+from streamlit_folium import st_folium
+import numpy as np
+
+import utils
+import aggregates
+import spatial
+
+st.set_page_config(layout="centered")
+
+
+def load_index():
+    return utils.derived('spatial_index', lambda snapshot: spatial.SpatialIndex(snapshot.municipalities))
+
+
+def load_profile():
+    return utils.derived('city_profile', lambda snapshot: aggregates.city_profile(snapshot.facts))
+
+
+def main():
+    st.title('Área de Influência')
+    st.markdown(
+        "Quantos motoristas pesados vivem perto de um centro de distribuição? "
+        "Escolha um município como base e consulte os municípios dentro de um raio ou os vizinhos mais próximos."
+    )
+
+    index = load_index()
+    profile = load_profile()
+
+    # --- QUERY CONTROLS ---
+    col1, col2 = st.columns(2)
+    with col1:
+        hub = st.selectbox("Município base", options=sorted(index.cities), key="catchment_hub")
+        mode = st.radio("Consulta", ["Raio", "Vizinhos mais próximos"], horizontal=True)
+    with col2:
+        if mode == "Raio":
+            radius_km = st.slider("Raio (km)", min_value=10, max_value=300, value=50, step=10)
+        else:
+            k = st.slider("Número de municípios", min_value=1, max_value=50, value=10)
+            only_at_risk = st.checkbox(
+                "Apenas municípios com força de trabalho envelhecida",
+                help="Idade média dos motoristas pesados acima de 45 anos (Atenção ou Crítico)."
+            )
+
+    # --- SPATIAL QUERY ---
+    start = time.perf_counter()
+    lat, lon = index.location(hub)
+    if mode == "Raio":
+        distances = index.within(lat, lon, radius_km)
+    else:
+        at_risk = profile['Idade_Media'] > 45 if only_at_risk else None
+        distances = index.nearest(lat, lon, k, where=at_risk)
+    df_catchment, totals = spatial.catchment(profile, distances)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    # --- KPIs ---
+    k1, k2, k3 = st.columns(3)
+    k1.metric("Municípios", totals['municipios'])
+    k2.metric("Motoristas pesados", f"{totals['total_condutores']:,}".replace(',', '.'))
+    k3.metric(
+        "Com EAR", f"{totals['ear']:,}".replace(',', '.'),
+        f"{totals['ear'] / totals['total_condutores'] * 100:.1f}% do total" if totals['total_condutores'] else None,
+        delta_color="off"
+    )
+    k4, k5 = st.columns(2)
+    k4.metric("Idade Média", f"{totals['idade_media']:.1f} anos", totals['status_risco'], delta_color="off")
+    k5.metric(
+        "Índice de Reposição", f"{totals['indice_reposicao']:.2f}",
+        help="Razão entre Novos Entrantes (18-30 anos) e Veteranos (51-70 anos) na área."
+    )
+    st.caption(f"Consulta sobre {len(index.cities)} municípios calculada em {elapsed_ms:.1f} ms.")
+
+    # --- MAP ---
+    catchment_map = folium.Map(location=[lat, lon], zoom_start=8, tiles='cartodbpositron', scrollWheelZoom=False)
+    colormap = cm.LinearColormap(
+        colors=['#00FF00', '#FFFF00', '#FF0000'],
+        index=[40, 45, 50],
+        vmin=40,
+        vmax=50,
+        caption='Idade Média dos Motoristas (Anos)',
+    )
+    catchment_map.add_child(colormap)
+
+    if mode == "Raio":
+        folium.Circle(location=[lat, lon], radius=radius_km * 1000, color='#2c3e50', fill=False, weight=2).add_to(catchment_map)
+
+    for row in df_catchment.itertuples():
+        city_lat, city_lon = index.location(row.Index)
+        folium.CircleMarker(
+            location=[city_lat, city_lon],
+            radius=np.log1p(row.Total_Condutores) * 1.8,
+            color=None,
+            fill=True,
+            fill_color=colormap(row.Idade_Media),
+            fill_opacity=0.8,
+            tooltip=f'{row.Index}: {row.distancia_km:.0f} km, {row.Idade_Media:.1f} anos (média)',
+        ).add_to(catchment_map)
+
+    folium.Marker(location=[lat, lon], tooltip=hub, icon=folium.Icon(color='red', icon='star')).add_to(catchment_map)
+
+    st_folium(catchment_map, width=None, height=500, use_container_width=True)
+
+    # --- TABLE ---
+    st.dataframe(
+        df_catchment.reset_index()[['descricao_municipio', 'distancia_km', 'Total_Condutores', 'EAR', 'Idade_Media', 'Status_Risco']],
+        column_config={
+            "descricao_municipio": "Município",
+            "distancia_km": st.column_config.NumberColumn("Distância (km)", format="%.1f"),
+            "Total_Condutores": st.column_config.NumberColumn("Total CNH (C/D/E)", format="%d"),
+            "EAR": st.column_config.NumberColumn("Com EAR", format="%d"),
+            "Idade_Media": st.column_config.NumberColumn("Idade Média (Anos)", format="%.1f"),
+            "Status_Risco": "Nível de Alerta",
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import time
+
+import streamlit as st
+import plotly.express as px
+
+import utils
+import deltas
+
+st.set_page_config(layout="centered")
+
+BREAKDOWNS = {
+    "Município": 'descricao_municipio',
+    "Categoria CNH": 'categoria_cnh',
+    "Faixa etária": 'faixa_etaria',
+    "Gênero": 'genero',
+    "Bloqueio": 'condutor_bloqueado',
+}
+
+
+def month_label(month):
+    ano, mes = month
+    return f"{mes:02d}/{ano}"
+
+
+@st.cache_data(max_entries=4, show_spinner="Carregando extrato...")
+def load_month(path, version):
+    return utils.read_compacted(path)[0]
+
+
+def load_facts(path):
+    """Facts of an extract and their version. The current dataset comes from
+    the live snapshot, older months are read from disk."""
+    if path == utils.DATA_PATH:
+        snapshot = utils.current_dataset()
+        return snapshot.facts, snapshot.version
+    version = utils.dataset_version(path)
+    return load_month(path, version), version
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def compare(before_version, after_version, _before, _after):
+    start = time.perf_counter()
+    delta = deltas.diff(_before, _after)
+    return delta, (time.perf_counter() - start) * 1000
+
+
+def main():
+    st.title('Variação Mensal')
+    st.markdown(
+        "O que mudou entre dois extratos do Detran? Compare dois meses e veja onde a base de motoristas "
+        "cresceu ou encolheu, por município, categoria, faixa etária ou situação da CNH."
+    )
+
+    snapshots = deltas.available_snapshots()
+    if len(snapshots) < 2:
+        st.info(
+            "É preciso ao menos dois extratos para comparar. "
+            f"Guarde os meses anteriores em `{deltas.HISTORY_GLOB}`, ao lado do arquivo atual."
+        )
+        return
+
+    labels = {path: month_label(month) for path, month in snapshots}
+    paths = [path for path, _ in snapshots]
+
+    # --- MONTH SELECTION ---
+    col1, col2 = st.columns(2)
+    with col1:
+        before_path = st.selectbox("Antes", options=paths[:-1], index=len(paths) - 2, format_func=labels.get, key="delta_before")
+    with col2:
+        later = paths[paths.index(before_path) + 1:]
+        after_path = st.selectbox("Depois", options=later, index=len(later) - 1, format_func=labels.get, key="delta_after")
+
+    (before, before_version), (after, after_version) = load_facts(before_path), load_facts(after_path)
+    delta, elapsed_ms = compare(before_version, after_version, before, after)
+
+    # --- KPIs ---
+    summary = deltas.heavy_summary(delta)
+    k1, k2, k3 = st.columns(3)
+    for column, key, title in [(k1, 'pesados', "Motoristas pesados"), (k2, 'bloqueados', "Pesados bloqueados")]:
+        old, new = summary[key]
+        column.metric(
+            title, f"{new:,}".replace(',', '.'),
+            f"{new - old:+,}".replace(',', '.'),
+            delta_color="inverse" if key == 'bloqueados' else "normal"
+        )
+    old_index, new_index = summary['indice_reposicao']
+    k3.metric(
+        "Índice de Reposição", f"{new_index:.2f}", f"{new_index - old_index:+.2f}",
+        help="Razão entre Novos Entrantes (18-30 anos) e Veteranos (51-70 anos) nas categorias C, D e E."
+    )
+    st.caption(
+        f"{len(delta):,}".replace(',', '.')
+        + f" combinações de dimensões alinhadas entre {labels[before_path]} e {labels[after_path]} em {elapsed_ms:.0f} ms."
+    )
+
+    st.divider()
+
+    # --- BREAKDOWN ---
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        breakdown = st.selectbox("Analisar por", options=list(BREAKDOWNS), key="delta_breakdown")
+    with col2:
+        n = st.slider("Maiores variações", min_value=5, max_value=20, value=10)
+    heavy_only = st.checkbox("Apenas categorias pesadas (C, D e E)", value=True)
+
+    scope = delta[delta['categoria_cnh'].isin(utils.HEAVY_CATEGORIES)] if heavy_only else delta
+    column = BREAKDOWNS[breakdown]
+    table = deltas.by_dimension(scope, [column])
+    top = deltas.movers(table, n)
+
+    chart = (
+        table.loc[top['quedas'].index.append(top['altas'].index)]
+        .reset_index()
+        .assign(Sentido=lambda d: d['variacao'].gt(0).map({True: 'Alta', False: 'Queda'}))
+    )
+    fig = px.bar(
+        chart, x='variacao', y=column, orientation='h', color='Sentido',
+        color_discrete_map={'Alta': '#2ecc71', 'Queda': '#e74c3c'},
+        labels={'variacao': 'Variação de condutores', column: breakdown},
+        title=f"Maiores quedas e altas por {breakdown.lower()}",
+        hover_data={'crescimento_pct': ':.1f'},
+    )
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'}, legend_title_text=None)
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        table.sort_values('variacao').reset_index(),
+        column_config={
+            column: breakdown,
+            "antes": st.column_config.NumberColumn(labels[before_path], format="%d"),
+            "depois": st.column_config.NumberColumn(labels[after_path], format="%d"),
+            "variacao": st.column_config.NumberColumn("Variação", format="%+d"),
+            "crescimento_pct": st.column_config.NumberColumn("Crescimento (%)", format="%+.1f"),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+
+if __name__ == '__main__':
+    main()
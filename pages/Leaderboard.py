@@ -0,0 +1,99 @@
+import streamlit as st
+
+import utils
+import regions
+import rankings
+
+st.set_page_config(layout="centered")
+
+# Value format of each ranked metric
+FORMATS = {
+    'Hub_Total': "%d",
+    'Hub_S': "%d",
+    'Idade_Media': "%.1f",
+    'Indice_Reposicao': "%.2f",
+    'Pct_Bloqueados': "%.1f%%",
+    'Pct_Mulheres': "%.1f%%",
+}
+
+
+def load_rankings():
+    return utils.derived('rankings', rankings.build)
+
+
+def format_value(metric, value):
+    return (FORMATS[metric] % value).replace('.', ',')
+
+
+def main():
+    st.title('Ranking de Municípios')
+    st.markdown(
+        "Quem lidera e quem fica para trás? Ordene os municípios (ou as regiões) por volume de motoristas pesados, "
+        "idade média, reposição, bloqueios ou participação feminina, e veja a posição de cada um em todos os indicadores."
+    )
+
+    index_levels = load_rankings()
+    # Regions are offered only when the mapping file splits the state
+    levels = {
+        regions.LEVEL_LABELS[level]: level
+        for level in regions.available_levels(utils.derived('regions', regions.build))
+    }
+
+    # --- LEADERBOARD ---
+    col1, col2 = st.columns(2)
+    with col1:
+        level = levels[st.selectbox("Nível", options=list(levels), key="board_level")]
+    with col2:
+        metric = st.selectbox("Indicador", options=list(rankings.METRICS), format_func=rankings.METRICS.get, key="board_metric")
+    index = index_levels[level]
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        largest = st.radio("Ordem", options=["Maiores", "Menores"], horizontal=True, key="board_order") == "Maiores"
+    with col2:
+        ranked = index.size(metric)
+        # A slider needs two distinct bounds: with 0 or 1 ranked units there is nothing to choose
+        k = ranked
+        if ranked > 1:
+            k = st.slider("Quantidade", min_value=1, max_value=ranked, value=min(10, ranked), key="board_k")
+
+    board = index.top(metric, k, largest=largest)
+    st.dataframe(
+        board[['posicao', metric, 'percentil']].rename_axis('unidade').reset_index(),
+        column_config={
+            "posicao": st.column_config.NumberColumn("Posição", format="%dº"),
+            "unidade": regions.LEVEL_LABELS[level],
+            metric: st.column_config.NumberColumn(rankings.METRICS[metric], format=FORMATS[metric]),
+            "percentil": st.column_config.ProgressColumn("Percentil", format="%.0f", min_value=0, max_value=100),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption(
+        f"{ranked} {regions.LEVEL_LABELS[level].lower()}(s) com dado para o indicador. "
+        "A posição conta a partir do maior valor; o percentil é a parcela das unidades com valor igual ou menor."
+    )
+
+    st.divider()
+
+    # --- POSITION OF ONE UNIT ---
+    st.subheader("Posição em cada indicador")
+    unit = st.selectbox(regions.LEVEL_LABELS[level], options=list(index.table.index), key="board_unit")
+
+    cols = st.columns(3)
+    for i, (column, label) in enumerate(rankings.METRICS.items()):
+        rank, total, percentile = index.rank_of(unit, column)
+        if rank is None:
+            cols[i % 3].metric(label, "—", help="Sem motoristas pesados para calcular o indicador.")
+            continue
+        cols[i % 3].metric(
+            label,
+            f"{rank}º de {total}",
+            f"percentil {percentile:.0f}",
+            delta_color="off",
+            help=f"Valor: {format_value(column, index.table.at[unit, column])}"
+        )
+
+
+if __name__ == '__main__':
+    main()
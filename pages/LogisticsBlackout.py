@@ -1,52 +1,91 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
-from utils import load_data
+import utils
+import aggregates
+import age_bands
+import regions
+import rankings
+import workers
+import maps
 import folium
-import branca.colormap as cm
 from streamlit_folium import st_folium
-import numpy as np
 
 
 st.set_page_config(layout="centered")
 
-st.title('Apagão Logístico')
+# Aggregates computed once per dataset version and shared by every session
+def city_risk(snapshot):
+    return aggregates.city_risk_table(snapshot.facts)
+
+
+def risk_markers(snapshot):
+    # Marker data of the risk map, built in a worker process
+    return workers.offload(maps.risk_markers, snapshot.municipalities[['lat', 'lon']], snapshot=snapshot)
+
+
+def age_band_levels(snapshot):
+    # Age-band model of every level of the regional hierarchy, from municipalities to the state
+    model = age_bands.AgeBandModel.from_facts(snapshot.facts)
+    hierarchy = regions.load_hierarchy(regions.REGIONS_PATH, snapshot.municipalities)
+    parents = regions.parents_of(hierarchy, model.units)
+    return {level: model if level == regions.LEVELS[0] else model.rollup(parents[level]) for level in regions.LEVELS}
+
 
-df = load_data()
+def alert_cities(snapshot):
+    # Municipalities with heavy drivers (any category containing C, D or E)
+    return sorted(aggregates.alert_scope(snapshot.facts)['descricao_municipio'].unique())
+
+
+# Depends on the filters, so it is cached per version and filter; the groupby
+# itself runs in a worker process, off the script thread
+@st.cache_data(max_entries=64, show_spinner=False)
+def ear_by_age(version, city, categories):
+    return workers.offload(aggregates.ear_by_age, city, categories)
+
+
+st.title('Apagão Logístico')
 
 #
 # --- BLOCO 1: O ALERTA (HEADLINE) ---
 #
 
-# 1. Filtro de Escopo (Categorias Pesadas: C, D, E)
-# Regex captura qualquer categoria que contenha C, D ou E (ex: AC, AD, AE)
-df_alert = df[df['categoria_cnh'].str.contains('C|D|E', regex=True)]
-
-# 2. Cálculo de Grupos (Novos Entrantes vs Veteranos)
-new_entrants_ages = ['18-21 ANOS', '22-25 ANOS', '26-30 ANOS']
-veterans_ages = ['51-60 ANOS', '61-70 ANOS']
+# 1. UI: Headline e Alerta
+st.markdown('### 🚨 Alerta: Envelhecimento da Mão de Obra')
 
-count_new_entrants = df_alert[df_alert['faixa_etaria'].isin(new_entrants_ages)]['qtd_condutores'].sum()
-count_veterans = df_alert[df_alert['faixa_etaria'].isin(veterans_ages)]['qtd_condutores'].sum()
+# 2. Definição de Novos Entrantes e Veteranos (qualquer intervalo contíguo de faixas).
+# Cada intervalo é respondido pelas somas acumuladas do modelo de faixas, sem reagrupar o dataset.
+band_levels = utils.derived('age_bands', age_band_levels)
 
-# 3. Cálculo do Índice de Reposição
-# Evita divisão por zero
-replacement_index = count_new_entrants / count_veterans if count_veterans > 0 else 0.0
+with st.expander("⚙️ Ajustar faixas etárias"):
+    col_new, col_vet = st.columns(2)
+    with col_new:
+        entrant_bands = st.select_slider(
+            "Novos Entrantes", options=utils.AGE_ORDER, value=age_bands.NEW_ENTRANTS, key="entrant_bands"
+        )
+    with col_vet:
+        veteran_bands = st.select_slider(
+            "Veteranos", options=utils.AGE_ORDER, value=age_bands.VETERANS, key="veteran_bands"
+        )
+entrants_label = age_bands.range_label(entrant_bands)
+veterans_label = age_bands.range_label(veteran_bands)
 
-# 4. UI: Headline e Alerta
-st.markdown('### 🚨 Alerta: Envelhecimento da Mão de Obra')
+# 3. Cálculo do Índice de Reposição (Novos Entrantes vs Veteranos)
+replacement = band_levels['estado'].replacement_index(entrant_bands, veteran_bands).loc[regions.STATE]
+count_new_entrants = replacement['novos_entrantes']
+count_veterans = replacement['veteranos']
+replacement_index = replacement['indice_reposicao']
 
 st.metric(
     label="Índice de Reposição de Motoristas",
     value=f"{replacement_index:.2f}",
     delta=f"{replacement_index - 1.0:.2f} (Déficit)" if replacement_index < 1.0 else f"+{replacement_index - 1.0:.2f}",
-    help="Razão entre Novos Entrantes (18-30 anos) e Veteranos (51-70 anos). Valores abaixo de 1.0 indicam retração da força de trabalho."
+    help=f"Razão entre Novos Entrantes ({entrants_label} anos) e Veteranos ({veterans_label} anos). Valores abaixo de 1.0 indicam retração da força de trabalho."
 )
 
 # Texto Sociológico com estilização de alerta
 alert_msg = (
-    f"**Análise Crítica:** Para cada 1 motorista veterano (51-70 anos) próximo da aposentadoria, o mercado repõe apenas **{replacement_index:.2f}** novos condutores.\n\n"
-    f"**Base de Comparação:** O cálculo confronta **{f'{count_veterans:,.0f}'.replace(',', '.')}** veteranos (51-70 anos) contra apenas **{f'{count_new_entrants:,.0f}'.replace(',', '.')}** novos entrantes (18-30 anos).\n\n"
+    f"**Análise Crítica:** Para cada 1 motorista veterano ({veterans_label} anos) próximo da aposentadoria, o mercado repõe apenas **{replacement_index:.2f}** novos condutores.\n\n"
+    f"**Base de Comparação:** O cálculo confronta **{f'{count_veterans:,.0f}'.replace(',', '.')}** veteranos ({veterans_label} anos) contra apenas **{f'{count_new_entrants:,.0f}'.replace(',', '.')}** novos entrantes ({entrants_label} anos).\n\n"
     "Como incentivar os jovens a entrar no setor?"
 )
 
@@ -64,32 +103,14 @@ st.divider()
 with st.container():
     st.subheader("O Abismo Geracional")
 
-    # 1. Definição dos Grupos Etários
-    young_ages = ['18-21 ANOS', '22-25 ANOS', '26-30 ANOS']
-    vet_ages = ['51-60 ANOS', '61-70 ANOS']
-
-    # Normalização de Categorias (Agrupamento Visual)
-    def normalize_category(cat):
-        if 'E' in cat: return 'Categoria E'
-        if 'D' in cat: return 'Categoria D'
-        if 'C' in cat: return 'Categoria C'
-        return cat
+    # 1. Novos Entrantes e Veteranos por categoria (C, D e E), com as faixas escolhidas acima
+    df_tornado = band_levels['estado'].by_category(entrant_bands, veteran_bands)
+    df_tornado = df_tornado.rename(columns={'novos_entrantes': 'Novos Entrantes', 'veteranos': 'Veteranos'})
+    df_tornado = df_tornado[(df_tornado['Novos Entrantes'] > 0) | (df_tornado['Veteranos'] > 0)]
+    df_tornado.index = 'Categoria ' + df_tornado.index
 
-    df_chart = df_alert.copy()
-    df_chart['categoria_agrupada'] = df_chart['categoria_cnh'].apply(normalize_category)
-
-    # 2. Agrupamento de Dados (Pandas)
-    # Novos Entrantes (18-30)
-    df_young = df_chart[df_chart['faixa_etaria'].isin(young_ages)].groupby('categoria_agrupada')['qtd_condutores'].sum().reset_index()
-    df_young.rename(columns={'qtd_condutores': 'Novos Entrantes', 'categoria_agrupada': 'categoria_cnh'}, inplace=True)
-
-    # Veteranos (51-70)
-    df_vet = df_chart[df_chart['faixa_etaria'].isin(vet_ages)].groupby('categoria_agrupada')['qtd_condutores'].sum().reset_index()
-    df_vet.rename(columns={'qtd_condutores': 'Veteranos', 'categoria_agrupada': 'categoria_cnh'}, inplace=True)
-
-    # Merge e Ordenação
-    df_tornado = pd.merge(df_vet, df_young, on='categoria_cnh', how='outer').fillna(0)
-    df_tornado = df_tornado.sort_values('Veteranos', ascending=True)
+    # 2. Ordenação
+    df_tornado = df_tornado.rename_axis('categoria_cnh').reset_index().sort_values('Veteranos', ascending=True)
 
     # 3. Preparação para o Gráfico Divergente (Inversão de Sinal)
     df_tornado['Veteranos_Neg'] = df_tornado['Veteranos'] * -1
@@ -158,7 +179,7 @@ with st.container():
     # --- UI FILTERS ---
     col1, col2 = st.columns(2)
     with col1:
-        city_list = ['Todas'] + sorted(df_alert['descricao_municipio'].unique())
+        city_list = ['Todas'] + utils.derived('alert_cities', alert_cities)
         selected_city = st.selectbox(
             "Filtrar por município",
             options=city_list,
@@ -174,92 +195,70 @@ with st.container():
         )
 
     # --- DATA FILTERING ---
-    df_filtered = df_alert.copy()
-
-    if selected_city != 'Todas':
-        df_filtered = df_filtered[df_filtered['descricao_municipio'] == selected_city]
-
-    def simplify_category(cat):
-        if 'E' in cat: return 'E'
-        if 'D' in cat: return 'D'
-        if 'C' in cat: return 'C'
-        return cat
-    
-    if selected_categories:
-        df_filtered['categoria_simplificada'] = df_filtered['categoria_cnh'].apply(simplify_category)
-        df_filtered = df_filtered[df_filtered['categoria_simplificada'].isin(selected_categories)]
-    else:
-        # Create an empty dataframe with the same columns if no categories are selected
-        df_filtered = df_filtered.iloc[0:0]
+    df_ear = ear_by_age(
+        utils.current_dataset().version,
+        None if selected_city == 'Todas' else selected_city,
+        tuple(selected_categories)
+    )
 
     # --- CHART LOGIC ---
-    if df_filtered.empty:
+    if df_ear.empty:
         st.warning("Nenhum dado disponível para a seleção atual.")
     else:
-        df_ear = df_filtered.groupby(['faixa_etaria', 'exerce_atividade_remunerada'])['qtd_condutores'].sum().reset_index()
+        df_ear['Status'] = df_ear['exerce_atividade_remunerada'].map({'S': 'Profissional (EAR)', 'N': 'Apenas Habilitado'})
+
+        df_pivot = df_ear.pivot(index='faixa_etaria', columns='Status', values='qtd_condutores')
+        # Reindex to ensure all age groups are present for a consistent chart axis
+        df_pivot = df_pivot.reindex(utils.AGE_ORDER, fill_value=0)
         
-        if df_ear.empty:
-             st.warning("Nenhum dado disponível para a seleção atual.")
-        else:
-            age_order = [
-                '18-21 ANOS', '22-25 ANOS', '26-30 ANOS', '31-40 ANOS',
-                '41-50 ANOS', '51-60 ANOS', '61-70 ANOS', '71-80 ANOS',
-                '81-90 ANOS', '91-100 ANOS'
-            ]
-            df_ear['Status'] = df_ear['exerce_atividade_remunerada'].map({'S': 'Profissional (EAR)', 'N': 'Apenas Habilitado'})
-
-            df_pivot = df_ear.pivot(index='faixa_etaria', columns='Status', values='qtd_condutores')
-            # Reindex to ensure all age groups are present for a consistent chart axis
-            df_pivot = df_pivot.reindex(age_order, fill_value=0)
-            
-            for col in ['Profissional (EAR)', 'Apenas Habilitado']:
-                if col not in df_pivot.columns:
-                    df_pivot[col] = 0
-            
-            df_pivot = df_pivot.reset_index()
+        for col in ['Profissional (EAR)', 'Apenas Habilitado']:
+            if col not in df_pivot.columns:
+                df_pivot[col] = 0
+        
+        df_pivot = df_pivot.reset_index()
 
-            # Calculate Total and Percentage, avoiding division by zero
-            df_pivot['Total'] = df_pivot['Profissional (EAR)'] + df_pivot['Apenas Habilitado']
-            df_pivot['Pct_EAR'] = df_pivot.apply(
-                lambda row: (row['Profissional (EAR)'] / row['Total']) * 100 if row['Total'] > 0 else 0,
-                axis=1
-            )
+        # Calculate Total and Percentage, avoiding division by zero
+        df_pivot['Total'] = df_pivot['Profissional (EAR)'] + df_pivot['Apenas Habilitado']
+        df_pivot['Pct_EAR'] = df_pivot.apply(
+            lambda row: (row['Profissional (EAR)'] / row['Total']) * 100 if row['Total'] > 0 else 0,
+            axis=1
+        )
 
-            # Construção do Gráfico Dual Axis
-            fig_ear = go.Figure()
-
-            # Barra Única (Volume Total)
-            fig_ear.add_trace(go.Bar(
-                x=df_pivot['faixa_etaria'], y=df_pivot['Total'],
-                name='Total de Condutores', marker_color='#2c3e50'
-            ))
-
-            # Linha de Percentual (Eixo Secundário)
-            fig_ear.add_trace(go.Scatter(
-                x=df_pivot['faixa_etaria'], y=df_pivot['Pct_EAR'],
-                name='% Conversão EAR', yaxis='y2',
-                mode='lines+markers+text',
-                line=dict(color='#D50000', width=3),
-                text=[f'{x:.0f}%' for x in df_pivot['Pct_EAR']],
-                textposition='top center',
-                hovertemplate='&#37; Conversão EAR: <b>%{y:.0f}%</b><extra></extra>'
-            ))
-            
-            fig_ear.update_layout(
-                title='Conversão Profissional: Volume vs Taxa de Atividade',
-                xaxis=dict(title='Faixa Etária', tickangle=-45),
-                yaxis=dict(title='Quantidade de Condutores'),
-                yaxis2=dict(
-                    title='% Conversão EAR', overlaying='y', side='right',
-                    range=[0, 115], showgrid=False
-                ),
-                legend=dict(orientation="h", y=1.1, x=0.5, xanchor='center'),
-                height=500,
-                hovermode='x unified',
-                margin=dict(l=20, r=20, t=80, b=100)
-            )
+        # Construção do Gráfico Dual Axis
+        fig_ear = go.Figure()
+
+        # Barra Única (Volume Total)
+        fig_ear.add_trace(go.Bar(
+            x=df_pivot['faixa_etaria'], y=df_pivot['Total'],
+            name='Total de Condutores', marker_color='#2c3e50'
+        ))
+
+        # Linha de Percentual (Eixo Secundário)
+        fig_ear.add_trace(go.Scatter(
+            x=df_pivot['faixa_etaria'], y=df_pivot['Pct_EAR'],
+            name='% Conversão EAR', yaxis='y2',
+            mode='lines+markers+text',
+            line=dict(color='#D50000', width=3),
+            text=[f'{x:.0f}%' for x in df_pivot['Pct_EAR']],
+            textposition='top center',
+            hovertemplate='&#37; Conversão EAR: <b>%{y:.0f}%</b><extra></extra>'
+        ))
+        
+        fig_ear.update_layout(
+            title='Conversão Profissional: Volume vs Taxa de Atividade',
+            xaxis=dict(title='Faixa Etária', tickangle=-45),
+            yaxis=dict(title='Quantidade de Condutores'),
+            yaxis2=dict(
+                title='% Conversão EAR', overlaying='y', side='right',
+                range=[0, 115], showgrid=False
+            ),
+            legend=dict(orientation="h", y=1.1, x=0.5, xanchor='center'),
+            height=500,
+            hovermode='x unified',
+            margin=dict(l=20, r=20, t=80, b=100)
+        )
 
-            st.plotly_chart(fig_ear, use_container_width=True)
+        st.plotly_chart(fig_ear, use_container_width=True)
 
 #
 # --- BLOCO 4: TABELA DE RISCO REGIONAL ---
@@ -270,54 +269,69 @@ with st.container():
     st.subheader("📍 Mapa de Risco: Onde o Apagão é Iminente?")
     st.markdown("Identifique os municípios com a maior idade média da frota de condutores pesados.")
 
-    # 1. Lógica de Cálculo da Idade Média Ponderada
-    age_midpoints = {
-        '18-21 ANOS': 19.5, '22-25 ANOS': 23.5, '26-30 ANOS': 28.0,
-        '31-40 ANOS': 35.5, '41-50 ANOS': 45.5, '51-60 ANOS': 55.5,
-        '61-70 ANOS': 65.5, '71-80 ANOS': 75.5, '81-90 ANOS': 85.5,
-        '91-100 ANOS': 95.5, 'MAIOR DE 100 ANOS': 100.0
+    # 1. Idade Média Ponderada por Município (ordenada da mais alta para a mais baixa)
+    df_city_risk = utils.derived('city_risk', city_risk)
+
+    # 2. Nível de análise: municípios ou regiões, com drill-down na região acima.
+    # Cada nível é uma consulta aos rollups pré-calculados, sem reagrupar o dataset.
+    # As regiões só aparecem quando o arquivo de regiões divide o estado.
+    region_levels = utils.derived('regions', regions.build)
+    risk_levels = {regions.LEVEL_LABELS[level]: level for level in regions.available_levels(region_levels)}
+    # Plural, artigo e concordância de cada nível
+    level_names = {
+        'descricao_municipio': ('municípios', 'os', 'específicos'),
+        'microrregiao': ('microrregiões', 'as', 'específicas'),
+        'macrorregiao': ('macrorregiões', 'as', 'específicas'),
     }
 
-    df_risk = df_alert.copy()
-    df_risk['idade_media_faixa'] = df_risk['faixa_etaria'].map(age_midpoints)
-    
-    # Cálculo Ponderado: (Idade * Qtd)
-    df_risk['soma_ponderada'] = df_risk['idade_media_faixa'] * df_risk['qtd_condutores']
-
-    # Agrupamento por Município
-    df_city_risk = df_risk.groupby('descricao_municipio').agg(
-        Total_Condutores=('qtd_condutores', 'sum'),
-        Soma_Ponderada=('soma_ponderada', 'sum')
-    ).reset_index()
+    col_level, col_parent = st.columns(2)
+    with col_level:
+        risk_level = risk_levels[st.selectbox("Nível de análise", options=list(risk_levels), key="risk_level")]
+    level_plural, level_article, level_specific = level_names[risk_level]
+    level_above = regions.LEVELS[regions.LEVELS.index(risk_level) + 1]
+    risk_parent = None
+    with col_parent:
+        if level_above in risk_levels.values():
+            risk_parent = st.selectbox(
+                f"Dentro de ({regions.LEVEL_LABELS[level_above]})",
+                options=['Todo o estado'] + sorted(region_levels[level_above].index),
+                key="risk_parent"
+            )
+            risk_parent = None if risk_parent == 'Todo o estado' else risk_parent
 
-    # Idade Média Final
-    df_city_risk['Idade_Media'] = df_city_risk['Soma_Ponderada'] / df_city_risk['Total_Condutores']
-    df_city_risk['Status_Risco'] = df_city_risk['Idade_Media'].apply(lambda x: '🚨 Crítico' if x > 50 else '⚠️ Atenção' if x > 45 else '✅ Estável')
+    df_risk_rank = regions.children(region_levels, risk_level, risk_parent).rename_axis('unidade').reset_index()
+    df_risk_rank = df_risk_rank[df_risk_rank['Total_Condutores'] > 0].sort_values('Idade_Media', ascending=False)
+    # Índice de Reposição com as faixas escolhidas no topo da página
+    unit_replacement = band_levels[risk_level].replacement_index(entrant_bands, veteran_bands)['indice_reposicao']
+    df_risk_rank['Indice_Reposicao'] = df_risk_rank['unidade'].map(unit_replacement).fillna(0.0)
 
-    # 2. UI Interativa (Default: Top 10, Opcional: Comparação)
-    df_city_risk = df_city_risk.sort_values('Idade_Media', ascending=False)
+    # 3. UI Interativa (Default: Top 10, Opcional: Comparação)
 
-    compare_mode = st.toggle("Quero comparar municípios específicos")
+    compare_mode = st.toggle(f"Quero comparar {level_plural} {level_specific}")
 
     if compare_mode:
         selected_cities = st.multiselect(
-            "Selecione os municípios para comparar",
-            options=sorted(df_city_risk['descricao_municipio'].unique()),
+            f"Selecione {level_article} {level_plural} para comparar",
+            options=sorted(df_risk_rank['unidade'].unique()),
             default=[]
         )
         # Show dataframe only if cities are selected
         if selected_cities:
-            df_display = df_city_risk[df_city_risk['descricao_municipio'].isin(selected_cities)]
+            df_display = df_risk_rank[df_risk_rank['unidade'].isin(selected_cities)]
             st.dataframe(
-                df_display[['descricao_municipio', 'Total_Condutores', 'Idade_Media', 'Status_Risco']],
+                df_display[['unidade', 'Total_Condutores', 'Idade_Media', 'Indice_Reposicao', 'Status_Risco']],
                 column_config={
-                    "descricao_municipio": "Município",
+                    "unidade": regions.LEVEL_LABELS[risk_level],
                     "Total_Condutores": st.column_config.NumberColumn("Total CNH (C/D/E)", format="%d"),
                     "Idade_Media": st.column_config.ProgressColumn(
                         "Idade Média (Anos)",
                         format="%.1f",
-                        min_value=df_city_risk['Idade_Media'].min(),
-                        max_value=df_city_risk['Idade_Media'].max(),
+                        min_value=df_risk_rank['Idade_Media'].min(),
+                        max_value=df_risk_rank['Idade_Media'].max(),
+                    ),
+                    "Indice_Reposicao": st.column_config.NumberColumn(
+                        "Índice de Reposição", format="%.2f",
+                        help=f"Novos Entrantes ({entrants_label} anos) sobre Veteranos ({veterans_label} anos)."
                     ),
                     "Status_Risco": "Nível de Alerta"
                 },
@@ -325,8 +339,10 @@ with st.container():
                 hide_index=True
             )
     else:
-        with st.expander("🏆 Top 8 Municípios por Idade Média de Motoristas", expanded=True):
-            top_8_cities = df_city_risk.head(8)
+        with st.expander(f"🏆 Top 8 {level_plural.capitalize()} por Idade Média de Motoristas", expanded=True):
+            # Read from the per-version ranking index (units without heavy drivers are not ranked)
+            top_8_cities = utils.derived('rankings', rankings.build)[risk_level].top('Idade_Media', 8, risk_parent)
+            top_8_cities = top_8_cities.rename_axis('unidade').reset_index()
             
             # Helper para criar colunas dinamicamente e evitar erro se houver menos de 8 cidades
             num_cities = len(top_8_cities)
@@ -337,7 +353,7 @@ with st.container():
                 for i in range(min(4, num_cities)):
                     row = top_8_cities.iloc[i]
                     cols_1[i].metric(
-                        label=f"{i + 1}. {row['descricao_municipio']}",
+                        label=f"{i + 1}. {row['unidade']}",
                         value=f"{row['Idade_Media']:.1f} anos",
                         help=f"Total de motoristas: {row['Total_Condutores']}"
                     )
@@ -348,28 +364,19 @@ with st.container():
                     for i in range(4, num_cities):
                         row = top_8_cities.iloc[i]
                         cols_2[i-4].metric(
-                            label=f"{i + 1}. {row['descricao_municipio']}",
+                            label=f"{i + 1}. {row['unidade']}",
                             value=f"{row['Idade_Media']:.1f} anos",
                             help=f"Total de motoristas: {row['Total_Condutores']}"
                         )
             else:
                 st.write("Nenhum dado de cidade para exibir.")
 
-# 1. DATA PREPARATION (Recalculating with Lat/Lon)
-
-# Reuse df_alert (C, D, E filtered)
-# Define midpoints (same as block above)
-df_map_age = df_alert.copy()
-df_map_age['idade_media_faixa'] = df_map_age['faixa_etaria'].map(age_midpoints)
-df_map_age['soma_ponderada'] = df_map_age['idade_media_faixa'] * df_map_age['qtd_condutores']
-
-# Group by City AND Lat/Lon
-df_city_age = df_map_age.groupby(['descricao_municipio', 'lat', 'lon']).agg(
-    total_pesados=('qtd_condutores', 'sum'),
-    soma_ponderada=('soma_ponderada', 'sum')
-).reset_index()
+# 1. DATA PREPARATION (Risk table + Lat/Lon)
 
-df_city_age['idade_media'] = df_city_age['soma_ponderada'] / df_city_age['total_pesados']
+# Positions, sizes, colors and texts of the markers, computed once per dataset
+# version. The folium objects below are created per run: rendering mutates
+# them, so they can't be shared between sessions
+markers = utils.derived('risk_markers', risk_markers)
 
 # 2. MAP CONFIGURATION
 
@@ -381,40 +388,22 @@ risk_map = folium.Map(
 )
 
 # Color Scale: Green (<40) -> Yellow (45) -> Red (>50)
-colormap = cm.LinearColormap(
-    colors=['#00FF00', '#FFFF00', '#FF0000'],
-    index=[40, 45, 50],
-    vmin=40,
-    vmax=50,
-    caption='Idade Média dos Motoristas (Anos)',
-)
-risk_map.add_child(colormap)
+risk_map.add_child(maps.risk_colormap())
 
 # 3. CIRCLE PLOTTING
 
-for _, row in df_city_age.iterrows():
-    # Visual filter: Shows only cities with minimal relevance (e.g., > 50 heavy drivers)
-    if row['total_pesados'] > 50:
-        # Size: Log to control visual scale
-        radius = np.log1p(row['total_pesados']) * 1.8
-
-        folium.CircleMarker(
-            location=[row['lat'], row['lon']],
-            radius=radius,
-            color=None,
-            fill=True,
-            fill_color=colormap(row['idade_media']),
-            fill_opacity=0.8,
-            popup=folium.Popup(
-                f"""
-                <b>{row['descricao_municipio']}</b><br>
-                Frota Pesada: {int(row['total_pesados']):,}<br>
-                Idade Média: {row['idade_media']:.1f} anos
-            """,
-                max_width=200,
-            ),
-            tooltip=f'{row["descricao_municipio"]}: {row["idade_media"]:.1f} anos (média)',
-        ).add_to(risk_map)
+# Only cities with minimal relevance (> 50 heavy drivers) have a marker
+for marker in markers:
+    folium.CircleMarker(
+        location=[marker['lat'], marker['lon']],
+        radius=marker['radius'],
+        color=None,
+        fill=True,
+        fill_color=marker['color'],
+        fill_opacity=0.8,
+        popup=folium.Popup(marker['popup'], max_width=200),
+        tooltip=marker['tooltip'],
+    ).add_to(risk_map)
 
 st_folium(risk_map, width=None, height=500, use_container_width=True)
 
@@ -1,34 +1,55 @@
 import streamlit as st
 import utils
+import aggregates
+import segments
+import regions
+import rankings
+import workers
+import maps
 import folium
 from folium.plugins import HeatMap
 from streamlit_folium import st_folium
-import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 
 st.set_page_config(layout="centered")
 
-def main():
-    st.title('Panorama geral da categoria')
 
-    df = utils.load_data()
+def load_overview():
+    # Computed once per dataset version, in a worker process
+    return utils.derived('overview', lambda snapshot: workers.offload(aggregates.heavy_overview, snapshot=snapshot))
+
+
+def load_heat_points():
+    # Heatmap points of the EAR workforce, computed once per dataset version in a worker process
+    return utils.derived('ear_heat_points', lambda snapshot: workers.offload(
+        maps.ear_heat_points, snapshot.municipalities[['lat', 'lon']], snapshot=snapshot
+    ))
+
+
+def load_segment_matrix():
+    return utils.derived('segment_matrix', segments.build)
 
-    # Filter for heavy vehicle drivers
-    heavy_categories = ['C', 'D', 'E', 'AC', 'AD', 'AE']
-    heavy_drivers_df = df[df['categoria_cnh'].isin(heavy_categories)].copy()
 
-    # Logic for categories (Pre-processing)
-    def simplify_category(cat):
-        if 'E' in cat: return 'E'
-        if 'D' in cat: return 'D'
-        return 'C'
-    heavy_drivers_df['categoria_simple'] = heavy_drivers_df['categoria_cnh'].apply(simplify_category)
+def load_regions():
+    return utils.derived('regions', regions.build)
+
+
+def load_rankings():
+    return utils.derived('rankings', rankings.build)
+
+
+def main():
+    st.title('Panorama geral da categoria')
+
+    # Heavy vehicle drivers (C, D, E, AC, AD and AE); shared, read-only tables
+    overview = load_overview()
 
-    total_heavy_drivers = heavy_drivers_df['qtd_condutores'].sum()
-    ear_heavy_drivers = heavy_drivers_df[heavy_drivers_df['exerce_atividade_remunerada'] == 'S']['qtd_condutores'].sum()
+    total_heavy_drivers = overview['total']
+    ear_heavy_drivers = overview['ear']
     
     # Calculations for the third metric's helper
-    age_group_counts = heavy_drivers_df.groupby('faixa_etaria')['qtd_condutores'].sum().sort_values(ascending=False)
+    age_group_counts = overview['faixas']
     predominant_age_group = age_group_counts.index[0]
     predominant_age_group_count = age_group_counts.iloc[0]
     predominant_age_group_percentage = (predominant_age_group_count / total_heavy_drivers) * 100
@@ -53,7 +74,7 @@ def main():
     # --- ROW 1.5: Blocked Drivers (New Section) ---
     st.subheader("Saúde da Frota e Disponibilidade Legal")
     
-    blocked_count = heavy_drivers_df[heavy_drivers_df['condutor_bloqueado'] == 'S']['qtd_condutores'].sum()
+    blocked_count = overview['bloqueados']
     blocked_pct = (blocked_count / total_heavy_drivers) * 100
     active_count = total_heavy_drivers - blocked_count
     
@@ -70,14 +91,8 @@ def main():
         st.caption(f"De um total de {total_heavy_drivers:,} condutores, apenas {active_count:,} estão aptos legalmente.")
 
     with col_b2:
-        df_block = heavy_drivers_df.groupby(['categoria_simple', 'condutor_bloqueado'])['qtd_condutores'].sum().unstack(fill_value=0)
-        # Ensure columns exist
-        for c in ['S', 'N']:
-            if c not in df_block.columns: df_block[c] = 0
-            
-        # Calculate percentages for text
-        df_block['Total'] = df_block['S'] + df_block['N']
-        df_block['Pct_Block'] = (df_block['S'] / df_block['Total']) * 100
+        # Blocked (S) vs active (N) per category, with percentages for text
+        df_block = overview['bloqueio']
         
         fig_block = go.Figure()
         fig_block.add_trace(go.Bar(y=df_block.index, x=df_block['N'], name='Ativos (Aptos)', orientation='h', marker_color='#2ecc71'))
@@ -90,7 +105,7 @@ def main():
 
     # --- Blocked by Age Group ---
     st.markdown("##### Bloqueios por Faixa Etária")
-    df_block_age = heavy_drivers_df[heavy_drivers_df['condutor_bloqueado'] == 'S'].groupby('faixa_etaria')['qtd_condutores'].sum().reset_index()
+    df_block_age = overview['bloqueados_faixa']
     
     fig_block_age = go.Figure(go.Bar(
         x=df_block_age['faixa_etaria'],
@@ -117,7 +132,7 @@ def main():
     
     with c1:
         st.markdown("**Distribuição por Categoria**")
-        df_cat = heavy_drivers_df.groupby('categoria_simple')['qtd_condutores'].sum().reset_index()
+        df_cat = overview['categorias']
         fig_donut = go.Figure(data=[go.Pie(
             labels=df_cat['categoria_simple'], 
             values=df_cat['qtd_condutores'], 
@@ -135,7 +150,7 @@ def main():
     with c2:
         st.markdown("**Penetração do EAR**")
         # Calculate EAR stats per category
-        df_ear_stats = heavy_drivers_df.groupby(['categoria_simple', 'exerce_atividade_remunerada'])['qtd_condutores'].sum().unstack(fill_value=0)
+        df_ear_stats = overview['ear_categoria'].copy()
         
         if 'S' in df_ear_stats.columns:
             df_ear_stats['Total'] = df_ear_stats.sum(axis=1)
@@ -168,9 +183,30 @@ def main():
     st.divider()
 
     # --- ROW 4: Top 10 Hubs ---
-    st.subheader("Top 10 Polos Logísticos (Municípios)")
+    # Regions are offered only when the mapping file splits the state
+    hub_levels = {regions.LEVEL_LABELS[level]: level for level in regions.available_levels(load_regions())}
+    hub_col1, hub_col2 = st.columns(2)
+    with hub_col1:
+        hub_level = hub_levels[st.selectbox("Agrupar polos por", options=list(hub_levels), key="hub_level")]
+    # Drill-down: restrict to one unit of the level above (the whole state for the top level offered)
+    level_above = regions.LEVELS[regions.LEVELS.index(hub_level) + 1]
+    with hub_col2:
+        hub_parent = 'Todo o estado'
+        if level_above in hub_levels.values():
+            hub_parent = st.selectbox(
+                f"Dentro de ({regions.LEVEL_LABELS[level_above]})",
+                options=['Todo o estado'] + sorted(load_regions()[level_above].index),
+                key="hub_parent"
+            )
+
+    level_title = {'descricao_municipio': 'Municípios', 'microrregiao': 'Microrregiões', 'macrorregiao': 'Macrorregiões'}[hub_level]
+    st.subheader(f"Top 10 Polos Logísticos ({level_title})")
     
-    city_counts = heavy_drivers_df.groupby('descricao_municipio')['qtd_condutores'].sum().sort_values(ascending=False)
+    # Heavy drivers per unit (Total) split by EAR status (S/N): the leader plus the next 10,
+    # read from the per-version ranking index instead of sorted per run
+    hub_rankings = load_rankings()[hub_level].top('Hub_Total', 11, None if hub_parent == 'Todo o estado' else hub_parent)
+    hub_rankings = hub_rankings[['Hub_Total', 'Hub_S', 'Hub_N']].rename(columns=lambda col: col.removeprefix('Hub_'))
+    city_counts = hub_rankings['Total']
     top_city_name = city_counts.index[0]
     top_city_val = city_counts.iloc[0]
     
@@ -178,7 +214,7 @@ def main():
     include_outlier = st.toggle(f"Incluir {top_city_name} (Líder Absoluto)", value=False)
     
     if not include_outlier:
-        st.metric(label=f"🥇 {top_city_name}", value=f"{top_city_val:,}", help="Este município foi separado do gráfico por ter uma escala muito superior aos demais, o que dificultaria a visualização.")
+        st.metric(label=f"🥇 {top_city_name}", value=f"{top_city_val:,}", help=f"{'Este município' if hub_level == 'descricao_municipio' else 'Esta região'} foi separado do gráfico por ter uma escala muito superior aos demais, o que dificultaria a visualização.")
         # Select 2nd to 11th place
         top_cities = city_counts.iloc[1:11].sort_values(ascending=True)
     else:
@@ -187,17 +223,8 @@ def main():
     # Prepare data for stacked bar chart (EAR vs Non-EAR)
     selected_cities = top_cities.index
     
-    # Filter for selected cities and pivot by EAR status
-    df_hubs = heavy_drivers_df[heavy_drivers_df['descricao_municipio'].isin(selected_cities)]
-    df_pivot = df_hubs.groupby(['descricao_municipio', 'exerce_atividade_remunerada'])['qtd_condutores'].sum().unstack(fill_value=0)
-    
-    # Ensure 'S' and 'N' columns exist
-    for col in ['S', 'N']:
-        if col not in df_pivot.columns:
-            df_pivot[col] = 0
-            
     # Reindex to match the sorted order (ascending for plot display)
-    df_pivot = df_pivot.reindex(selected_cities)
+    df_pivot = hub_rankings.reindex(selected_cities)
 
     fig_hubs = go.Figure()
     
@@ -240,38 +267,39 @@ def main():
     st.subheader("Diversidade e Inclusão")
     
     # Check columns existence to prevent errors
-    has_sexo = 'genero' in heavy_drivers_df.columns
-    pcd_col = 'pessoa_com_deficiencia'
-    has_pcd = pcd_col in heavy_drivers_df.columns
+    has_sexo = overview['mulheres_categoria'] is not None
+    has_pcd = overview['pcd_categoria'] is not None
     
     if has_sexo or has_pcd:
+        # Segment counts and shares for every category group and city, computed once
+        segment_counts = load_segment_matrix()
+        segment_shares = segments.shares(segment_counts)
+        state_heavy = (segments.STATE, segments.HEAVY_GROUP)
+        state_b = (segments.STATE, 'B')
+
         tab_women, tab_pcd = st.tabs(["👩 Mulheres", "♿ PCD"])
         
         # --- TAB: WOMEN ---
         if has_sexo:
             with tab_women:
-                women_df = heavy_drivers_df[heavy_drivers_df['genero'].isin(['MULHER', 'FEMININO', 'F'])]
-                women_count = women_df['qtd_condutores'].sum()
-                women_ear = women_df[women_df['exerce_atividade_remunerada'] == 'S']['qtd_condutores'].sum()
+                df_w_cat = overview['mulheres_categoria']
+                women_count = segment_counts.loc[state_heavy, 'Mulheres']
+                women_ear = segment_counts.loc[state_heavy, 'Mulheres com EAR']
                 women_ear_pct = (women_ear / women_count * 100) if women_count > 0 else 0
                 
                 st.metric("Mulheres Habilitadas", f"{women_count:,}", f"{women_ear_pct:.1f}% com EAR")
                 
                 # Comparison with Category B
-                df_b = df[df['categoria_cnh'] == 'B']
-                total_b = df_b['qtd_condutores'].sum()
-                women_b = df_b[df_b['genero'].isin(['MULHER', 'FEMININO', 'F'])]['qtd_condutores'].sum()
-                pct_women_b = (women_b / total_b * 100) if total_b > 0 else 0
-                pct_women_heavy = (women_count / total_heavy_drivers * 100) if total_heavy_drivers > 0 else 0
+                pct_women_b = segment_shares.loc[state_b, 'Mulheres'] * 100
+                pct_women_heavy = segment_shares.loc[state_heavy, 'Mulheres'] * 100
 
                 st.info(f"💡 **Disparidade de Gênero:** Enquanto na Categoria B (carros de passeio) as mulheres representam **{pct_women_b:.1f}%** dos condutores, nas categorias pesadas essa participação é de apenas **{pct_women_heavy:.1f}%**.")
 
-                if not women_df.empty:
+                if not df_w_cat.empty:
                     c_w1, c_w2 = st.columns([1, 2])
                     
                     with c_w1:
                         st.markdown("##### Categoria CNH")
-                        df_w_cat = women_df.groupby('categoria_simple')['qtd_condutores'].sum().reset_index()
                         fig_w_cat = go.Figure(data=[go.Pie(
                             labels=df_w_cat['categoria_simple'], 
                             values=df_w_cat['qtd_condutores'], 
@@ -288,10 +316,8 @@ def main():
 
                     with c_w2:
                         st.markdown("##### Distribuição Etária (Com vs Sem EAR)")
-                        df_w_age = women_df.groupby(['faixa_etaria', 'exerce_atividade_remunerada'])['qtd_condutores'].sum().unstack(fill_value=0)
-                        for c in ['S', 'N']:
-                            if c not in df_w_age.columns: df_w_age[c] = 0
-                        
+                        df_w_age = overview['mulheres_faixa']
+
                         fig_w = go.Figure()
                         fig_w.add_trace(go.Bar(x=df_w_age.index, y=df_w_age['S'], name='Com EAR', marker_color='#2ecc71'))
                         fig_w.add_trace(go.Bar(x=df_w_age.index, y=df_w_age['N'], name='Sem EAR', marker_color='#95a5a6'))
@@ -303,29 +329,26 @@ def main():
         # --- TAB: PCD ---
         if has_pcd:
             with tab_pcd:
-                pcd_df = heavy_drivers_df[heavy_drivers_df[pcd_col] == 'S']
-                pcd_count = pcd_df['qtd_condutores'].sum()
-                pcd_ear = pcd_df[pcd_df['exerce_atividade_remunerada'] == 'S']['qtd_condutores'].sum()
+                df_pcd_cat = overview['pcd_categoria']
+                pcd_count = segment_counts.loc[state_heavy, 'PCD']
+                pcd_ear = segment_counts.loc[state_heavy, 'PCD com EAR']
                 pcd_ear_pct = (pcd_ear / pcd_count * 100) if pcd_count > 0 else 0
                 
                 st.metric("Condutores PCD", f"{pcd_count:,}", f"{pcd_ear_pct:.1f}% com EAR")
                 
                 # Comparison with Category B
-                df_b = df[df['categoria_cnh'] == 'B']
-                total_b = df_b['qtd_condutores'].sum()
-                pcd_b = df_b[df_b[pcd_col] == 'S']['qtd_condutores'].sum()
-                pct_pcd_b = (pcd_b / total_b * 100) if total_b > 0 else 0
-                pct_pcd_heavy = (pcd_count / total_heavy_drivers * 100) if total_heavy_drivers > 0 else 0
+                pct_pcd_b = segment_shares.loc[state_b, 'PCD'] * 100
+                pct_pcd_heavy = segment_shares.loc[state_heavy, 'PCD'] * 100
 
                 st.info(f"💡 **Inclusão PCD:** Na Categoria B, motoristas PCD representam **{pct_pcd_b:.1f}%** do total. Nas categorias pesadas, essa proporção é de **{pct_pcd_heavy:.3f}%**.")
                 
-                if not pcd_df.empty:
+                if not df_pcd_cat.empty:
                     c_pcd1, c_pcd2, c_pcd3 = st.columns([1, 1, 2])
                     
                     with c_pcd1:
                         st.markdown("##### Gênero")
                         if has_sexo:
-                            df_pcd_sex = pcd_df.groupby('genero')['qtd_condutores'].sum().reset_index()
+                            df_pcd_sex = overview['pcd_genero']
                             fig_pcd_sex = go.Figure(data=[go.Pie(labels=df_pcd_sex['genero'], values=df_pcd_sex['qtd_condutores'], hole=.4)])
                             fig_pcd_sex.update_layout(height=300, margin=dict(t=20, b=20, l=20, r=20), legend=dict(orientation="h", y=-0.2))
                             st.plotly_chart(fig_pcd_sex, use_container_width=True)
@@ -334,7 +357,6 @@ def main():
                     
                     with c_pcd2:
                         st.markdown("##### Categoria CNH")
-                        df_pcd_cat = pcd_df.groupby('categoria_simple')['qtd_condutores'].sum().reset_index()
                         fig_pcd_cat = go.Figure(data=[go.Pie(
                             labels=df_pcd_cat['categoria_simple'], 
                             values=df_pcd_cat['qtd_condutores'], 
@@ -351,10 +373,8 @@ def main():
 
                     with c_pcd3:
                         st.markdown("##### Distribuição Etária (Com vs Sem EAR)")
-                        df_pcd_age = pcd_df.groupby(['faixa_etaria', 'exerce_atividade_remunerada'])['qtd_condutores'].sum().unstack(fill_value=0)
-                        for c in ['S', 'N']:
-                            if c not in df_pcd_age.columns: df_pcd_age[c] = 0
-                        
+                        df_pcd_age = overview['pcd_faixa']
+
                         fig_pcd_age = go.Figure()
                         fig_pcd_age.add_trace(go.Bar(x=df_pcd_age.index, y=df_pcd_age['S'], name='Com EAR', marker_color='#2ecc71'))
                         fig_pcd_age.add_trace(go.Bar(x=df_pcd_age.index, y=df_pcd_age['N'], name='Sem EAR', marker_color='#95a5a6'))
@@ -362,6 +382,22 @@ def main():
                         st.plotly_chart(fig_pcd_age, use_container_width=True)
                 else:
                     st.info("Não há dados de PCD para exibir.")
+
+        # --- Per-city comparison against the state ---
+        with st.expander("🔎 Comparar um município com o estado"):
+            city_options = sorted(segment_counts.index.get_level_values('descricao_municipio').unique().drop(segments.STATE))
+            compare_city = st.selectbox("Município", options=city_options, key="segment_city")
+            compare_segments = ['Mulheres', 'PCD', 'Bloqueados', 'EAR']
+            df_compare = pd.DataFrame({
+                f'{compare_city} (%)': segment_shares.loc[(compare_city, slice(None)), compare_segments].droplevel(0).stack(),
+                'Estado (%)': segment_shares.loc[(segments.STATE, slice(None)), compare_segments].droplevel(0).stack(),
+            }).mul(100).rename_axis(['Grupo', 'Segmento']).reset_index()
+            st.dataframe(
+                df_compare,
+                column_config={col: st.column_config.NumberColumn(format="%.2f") for col in df_compare.columns[2:]},
+                use_container_width=True,
+                hide_index=True
+            )
     else:
         st.info("Dados detalhados de Gênero e PCD não disponíveis nesta visualização.")
 
@@ -369,7 +405,7 @@ def main():
     st.divider()
     st.subheader("Distribuição Etária da Força de Trabalho")
     
-    age_dist = heavy_drivers_df.groupby('faixa_etaria')['qtd_condutores'].sum().reset_index()
+    age_dist = overview['distribuicao_etaria']
     
     fig_age = go.Figure(go.Bar(
         x=age_dist['faixa_etaria'],
@@ -388,15 +424,10 @@ def main():
     st.header('Onde estão esses profissionais?')
     st.subheader('Uma visão sobre a distribuição da força de trabalho ativa do estado')
 
-    ear_heavy_drivers_df = heavy_drivers_df[heavy_drivers_df['exerce_atividade_remunerada'] == 'S']
-    
-    heatmap_data = ear_heavy_drivers_df.groupby(['descricao_municipio', 'lat', 'lon'])['qtd_condutores'].sum().reset_index()
-    heatmap_data.dropna(subset=['lat', 'lon'], inplace=True)
-
     map_center = [-22.5, -48.5]
     m = folium.Map(location=map_center, zoom_start=7, tiles='CartoDB positron', scrollWheelZoom=False)
 
-    heat_data = [[row['lat'], row['lon'], np.log1p(row['qtd_condutores'])] for index, row in heatmap_data.iterrows()]
+    heat_data = load_heat_points()
 
     HeatMap(heat_data, radius=12, blur=8).add_to(m)
 
@@ -0,0 +1,172 @@
+import time
+
+import streamlit as st
+import folium
+import branca.colormap as cm
+from streamlit_folium import st_folium
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import utils
+import aggregates
+import projection
+
+st.set_page_config(layout="centered")
+
+COLUMNS = ['descricao_municipio', 'categoria_cnh', 'faixa_etaria', 'qtd_condutores']
+
+
+def _cohorts(snapshot):
+    cities, counts = projection.cohort_tensor(snapshot.facts[COLUMNS])
+    coords = snapshot.municipalities[['lat', 'lon']].reindex(cities)
+    return cities, counts, coords
+
+
+def load_cohorts():
+    return utils.derived('cohorts', _cohorts)
+
+
+def main():
+    st.title('Projeção da Força de Trabalho')
+    st.markdown(
+        "Envelhecemos a pirâmide etária dos motoristas pesados de cada município ano a ano, "
+        "aplicando taxas de saída por faixa etária e a entrada de novos condutores."
+    )
+
+    cities, counts, coords = load_cohorts()
+
+    # --- SCENARIO CONTROLS ---
+    col1, col2 = st.columns(2)
+    with col1:
+        horizon = st.slider("Horizonte (anos)", min_value=5, max_value=20, value=10)
+        entry_pct = st.slider(
+            "Ritmo de entrada de novos motoristas (%)", min_value=0, max_value=200, value=100, step=10,
+            help="100% mantém o ritmo atual de entrada, estimado pelo tamanho da faixa de 18-21 anos."
+        )
+    with col2:
+        retirement_pct = st.slider(
+            "Intensidade das saídas (%)", min_value=50, max_value=200, value=100, step=10,
+            help="Multiplica as taxas anuais de aposentadoria/abandono de cada faixa etária."
+        )
+        selected_categories = st.multiselect(
+            "Categorias", options=aggregates.CATEGORIES, default=aggregates.CATEGORIES
+        )
+
+    if not selected_categories:
+        st.warning("Selecione ao menos uma categoria.")
+        return
+
+    # --- PROJECTION (all cities x categories x years at once) ---
+    start = time.perf_counter()
+    retirement_rates = {
+        band: min(rate * retirement_pct / 100, 1.0) for band, rate in projection.DEFAULT_RETIREMENT_RATES.items()
+    }
+    projected = projection.project(counts, years=horizon, entry_rate=entry_pct / 100, retirement_rates=retirement_rates)
+    category_mask = np.isin(aggregates.CATEGORIES, selected_categories)
+    # (years + 1, cities, bands)
+    projected_cities = projected[:, :, category_mask, :].sum(axis=2)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    state_series = projected_cities.sum(axis=1)
+    workforce = state_series.sum(axis=-1)
+    state_index = projection.replacement_index(state_series)
+
+    # --- KPIs ---
+    k1, k2 = st.columns(2)
+    with k1:
+        st.metric(
+            label=f"Motoristas pesados em {horizon} anos",
+            value=f"{workforce[-1]:,.0f}",
+            delta=f"{(workforce[-1] / workforce[0] - 1) * 100:.1f}% vs hoje" if workforce[0] > 0 else None
+        )
+    with k2:
+        st.metric(
+            label=f"Índice de Reposição em {horizon} anos",
+            value=f"{state_index[-1]:.2f}",
+            delta=f"{state_index[-1] - state_index[0]:+.2f} vs hoje"
+        )
+    st.caption(f"Projeção de {len(cities)} municípios × {len(selected_categories)} categorias × {horizon} anos calculada em {elapsed_ms:.1f} ms.")
+
+    # --- TIME SERIES ---
+    years = np.arange(horizon + 1)
+    fig = go.Figure()
+    for idx, category in enumerate(aggregates.CATEGORIES):
+        if category in selected_categories:
+            fig.add_trace(go.Bar(
+                x=years, y=projected[:, :, idx, :].sum(axis=(1, 2)),
+                name=f'Categoria {category}'
+            ))
+    fig.add_trace(go.Scatter(
+        x=years, y=state_index, name='Índice de Reposição', yaxis='y2',
+        mode='lines+markers', line=dict(color='#D50000', width=3)
+    ))
+    fig.update_layout(
+        title='Força de Trabalho Projetada',
+        barmode='stack',
+        xaxis=dict(title='Anos a partir de hoje'),
+        yaxis=dict(title='Motoristas pesados'),
+        yaxis2=dict(title='Índice de Reposição', overlaying='y', side='right', showgrid=False, rangemode='tozero'),
+        legend=dict(orientation="h", y=1.15, x=0.5, xanchor='center'),
+        height=450,
+        margin=dict(l=20, r=20, t=80, b=40)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # --- PROJECTED RISK MAP ---
+    st.subheader(f"Mapa de Risco Projetado ({horizon} anos)")
+
+    df_projected = pd.DataFrame({
+        'descricao_municipio': cities,
+        'lat': coords['lat'].to_numpy(),
+        'lon': coords['lon'].to_numpy(),
+        'total_hoje': projected_cities[0].sum(axis=-1),
+        'total_projetado': projected_cities[-1].sum(axis=-1),
+        'indice_hoje': projection.replacement_index(projected_cities[0]),
+        'indice_projetado': projection.replacement_index(projected_cities[-1]),
+    }).dropna(subset=['lat', 'lon'])
+
+    risk_map = folium.Map(location=[-22.5, -48.5], zoom_start=7, tiles='cartodbpositron', scrollWheelZoom=False)
+    colormap = cm.LinearColormap(
+        colors=['#FF0000', '#FFFF00', '#00FF00'],
+        index=[0.25, 0.5, 1.0],
+        vmin=0.25,
+        vmax=1.0,
+        caption='Índice de Reposição Projetado',
+    )
+    risk_map.add_child(colormap)
+
+    # Same relevance filter as the current risk map
+    for row in df_projected[df_projected['total_hoje'] > 50].itertuples():
+        folium.CircleMarker(
+            location=[row.lat, row.lon],
+            radius=np.log1p(row.total_projetado) * 1.8,
+            color=None,
+            fill=True,
+            fill_color=colormap(min(max(row.indice_projetado, 0.25), 1.0)),
+            fill_opacity=0.8,
+            tooltip=f'{row.descricao_municipio}: índice {row.indice_hoje:.2f} → {row.indice_projetado:.2f}',
+        ).add_to(risk_map)
+
+    st_folium(risk_map, width=None, height=500, use_container_width=True)
+
+    with st.expander("Municípios com maior queda projetada da frota"):
+        df_table = df_projected[df_projected['total_hoje'] > 50].assign(
+            variacao=lambda d: (d['total_projetado'] / d['total_hoje'] - 1) * 100
+        ).sort_values('variacao').head(20)
+        st.dataframe(
+            df_table[['descricao_municipio', 'total_hoje', 'total_projetado', 'variacao', 'indice_projetado']],
+            column_config={
+                "descricao_municipio": "Município",
+                "total_hoje": st.column_config.NumberColumn("Frota Hoje", format="%d"),
+                "total_projetado": st.column_config.NumberColumn("Frota Projetada", format="%d"),
+                "variacao": st.column_config.NumberColumn("Variação (%)", format="%.1f"),
+                "indice_projetado": st.column_config.NumberColumn("Índice Projetado", format="%.2f"),
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Cohort-aging projection of the heavy-driver workforce.
+
+Every municipality's age-band distribution is aged forward year by year with
+a linear model: each band loses a share of its drivers to retirement, passes
+`1 / width` of the survivors on to the next band and the first band receives
+new entrants. Because the model is linear, the whole horizon is a stack of
+matrix powers and every city and category is projected in a single `einsum`.
+"""
+import numpy as np
+
+import aggregates
+import utils
+
+# Yearly share of each band's drivers that leaves the profession
+DEFAULT_RETIREMENT_RATES = {
+    '18-21 ANOS': 0.005, '22-25 ANOS': 0.005, '26-30 ANOS': 0.005, '31-40 ANOS': 0.005,
+    '41-50 ANOS': 0.01, '51-60 ANOS': 0.03, '61-70 ANOS': 0.08, '71-80 ANOS': 0.15,
+    '81-90 ANOS': 0.30, '91-100 ANOS': 0.50
+}
+
+_WIDTHS = np.array([hi - lo + 1 for lo, hi in utils.AGE_BOUNDS.values()], dtype=float)
+# Band groups compared by the replacement index (same as the "Apagão" page)
+_ENTRANTS = np.isin(utils.AGE_ORDER, aggregates.NEW_ENTRANTS_AGES)
+_VETERANS = np.isin(utils.AGE_ORDER, aggregates.VETERANS_AGES)
+
+
+def cohort_tensor(df):
+    """Counts heavy drivers (`aggregates.alert_scope`) per municipality, category and age band.
+
+    Args:
+        df (pd.DataFrame): Dataset from `utils.load_data` with categorical
+                           'descricao_municipio', 'categoria_cnh' and 'faixa_etaria'.
+
+    Returns:
+        tuple: The municipalities (pd.Index) and an array of shape
+               (municipalities, len(aggregates.CATEGORIES), len(utils.AGE_ORDER)).
+    """
+    return aggregates.heavy_tensor(df)
+
+
+def transition_matrix(retirement_rates=None):
+    """One-year transition between age bands.
+
+    Args:
+        retirement_rates (dict, optional): Yearly exit rate per band.
+                                           Defaults to `DEFAULT_RETIREMENT_RATES`.
+
+    Returns:
+        np.ndarray: Matrix A where `next_year = this_year @ A` (before new entrants).
+    """
+    rates = {**DEFAULT_RETIREMENT_RATES, **(retirement_rates or {})}
+    survival = 1 - np.array([rates[band] for band in utils.AGE_ORDER])
+    moving = 1 / _WIDTHS
+
+    matrix = np.diag(survival * (1 - moving))
+    # Drivers aging out of the last band leave the workforce
+    matrix[np.arange(len(_WIDTHS) - 1), np.arange(1, len(_WIDTHS))] = (survival * moving)[:-1]
+    return matrix
+
+
+def project(counts, years=20, entry_rate=1.0, retirement_rates=None):
+    """Projects the cohort tensor `years` ahead.
+
+    New entrants join the first band every year at `entry_rate` times today's
+    pace, estimated as the first band's size divided by its width.
+
+    Args:
+        counts (np.ndarray): Tensor from `cohort_tensor`, shape (..., bands).
+        years (int): Projection horizon.
+        entry_rate (float): Multiplier of the current yearly inflow.
+        retirement_rates (dict, optional): Overrides of `DEFAULT_RETIREMENT_RATES`.
+
+    Returns:
+        np.ndarray: Projected counts with shape (years + 1, *counts.shape);
+                    index 0 is the current snapshot.
+    """
+    matrix = transition_matrix(retirement_rates)
+    n_bands = len(matrix)
+
+    # powers[t] = A^t and accumulated[t] = A^0 + ... + A^(t-1)
+    powers = np.empty((years + 1, n_bands, n_bands))
+    powers[0] = np.eye(n_bands)
+    for t in range(1, years + 1):
+        powers[t] = powers[t - 1] @ matrix
+    accumulated = np.concatenate([np.zeros((1, n_bands, n_bands)), np.cumsum(powers[:-1], axis=0)])
+
+    inflow = entry_rate * counts[..., 0] / _WIDTHS[0]
+
+    return np.einsum('...b,tbd->t...d', counts, powers) + np.einsum('...,td->t...d', inflow, accumulated[:, 0, :])
+
+
+def replacement_index(projected):
+    """Entrants (18-30) over veterans (51-70) along the last axis; 0 where there are no veterans."""
+    entrants = projected[..., _ENTRANTS].sum(axis=-1)
+    veterans = projected[..., _VETERANS].sum(axis=-1)
+    return np.divide(entrants, veterans, out=np.zeros_like(entrants), where=veterans > 0)
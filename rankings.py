@@ -0,0 +1,110 @@
+"""Precomputed rankings of municipalities and regions under each metric.
+
+For every level of `regions` and every metric in `METRICS`, the units are
+sorted once per dataset version, largest value first, and each unit's rank
+and percentile are stored. The sorted order is also split by parent unit, so
+the pages read the top k of the state or of one region, and any unit's
+position, without sorting anything per rerun.
+"""
+import numpy as np
+import pandas as pd
+
+import regions
+
+# Ranked columns of the `regions` level tables -> label
+METRICS = {
+    'Hub_Total': 'Motoristas pesados',
+    'Hub_S': 'Motoristas pesados com EAR',
+    'Idade_Media': 'Idade média (anos)',
+    'Indice_Reposicao': 'Índice de reposição',
+    'Pct_Bloqueados': 'Bloqueados (%)',
+    'Pct_Mulheres': 'Mulheres (%)',
+}
+
+
+class RankingIndex:
+    """Every unit of one level sorted under each metric.
+
+    Units without a value for a metric (e.g. no heavy drivers, so no mean age)
+    are left out of that metric's ranking.
+
+    Args:
+        table (pd.DataFrame): A `regions` level table, indexed by unit, with the
+                              `METRICS` columns and 'pai' (the parent unit).
+        metrics (iterable): Columns to rank.
+
+    Attributes:
+        table (pd.DataFrame): The level table.
+        ranks (pd.DataFrame): 1-based rank per unit and metric (NaN if unranked).
+        percentiles (pd.DataFrame): Share of the ranked units at or below each
+                                    unit, in percent (100 for the first).
+    """
+
+    def __init__(self, table, metrics=METRICS):
+        # Sorted by name first, so the stable sort below breaks ties by name
+        self.table = table.sort_index()
+        self._order = {}
+        self._order_by_parent = {}
+
+        ranks = {}
+        for metric in metrics:
+            values = self.table[metric]
+            order = np.flatnonzero(values.notna().to_numpy())
+            order = order[np.argsort(-values.to_numpy()[order], kind='stable')]
+            self._order[metric] = order
+
+            parents = self.table['pai'].to_numpy()[order]
+            self._order_by_parent[metric] = {
+                parent: order[positions] for parent, positions in pd.Series(np.arange(len(order))).groupby(parents).indices.items()
+            } if len(order) else {}
+
+            rank = np.full(len(self.table), np.nan)
+            rank[order] = np.arange(1, len(order) + 1)
+            ranks[metric] = rank
+
+        self.ranks = pd.DataFrame(ranks, index=self.table.index)
+        counts = self.ranks.notna().sum()
+        self.percentiles = (counts - self.ranks + 1) / counts * 100
+
+    def size(self, metric, parent=None):
+        """Number of ranked units, in the whole level or inside `parent`."""
+        return len(self._positions(metric, parent))
+
+    def top(self, metric, k=10, parent=None, largest=True):
+        """The `k` units with the largest (or smallest) values, in ranking order.
+
+        Args:
+            metric (str): One of the ranked columns.
+            k (int): Number of units.
+            parent (str, optional): Only units inside this unit of the level above.
+            largest (bool): False for the `k` smallest values, smallest first.
+
+        Returns:
+            pd.DataFrame: Rows of `table`, with the state-wide 'posicao' and 'percentil'.
+        """
+        positions = self._positions(metric, parent)
+        positions = positions[:k] if largest else positions[::-1][:k]
+        rows = self.table.iloc[positions]
+        return rows.assign(
+            posicao=self.ranks[metric].iloc[positions].astype(int).to_numpy(),
+            percentil=self.percentiles[metric].iloc[positions].to_numpy(),
+        )
+
+    def rank_of(self, unit, metric):
+        """(rank, number of ranked units, percentile) of `unit`; rank is None if unranked."""
+        rank = self.ranks.at[unit, metric]
+        if np.isnan(rank):
+            return None, len(self._order[metric]), None
+        return int(rank), len(self._order[metric]), float(self.percentiles.at[unit, metric])
+
+    def _positions(self, metric, parent):
+        if parent is None:
+            return self._order[metric]
+        return self._order_by_parent[metric].get(parent, np.array([], dtype=int))
+
+
+def build(snapshot):
+    """A `RankingIndex` per level below the state, from the snapshot's regional rollups."""
+    # Same derivation the pages read through `utils.derived('regions', ...)`
+    levels = snapshot.derived('regions', regions.build)
+    return {level: RankingIndex(levels[level]) for level in regions.LEVELS[:-1]}
@@ -0,0 +1,150 @@
+"""Regional rollups: municipality -> micro-region -> macro-region -> state.
+
+The hierarchy comes from a local mapping file keyed on `codigo_ibge`. The
+additive per-municipality counts are summed once into each level from the
+level directly below it, and the ratios (mean age, replacement index, EAR
+rate) are derived from those sums, so every level is a ready-made table that
+pages only look up.
+"""
+import os
+
+import pandas as pd
+
+import aggregates
+import segments
+
+REGIONS_PATH = 'regioes_sp.csv'
+
+# Finest to coarsest
+LEVELS = ['descricao_municipio', 'microrregiao', 'macrorregiao', 'estado']
+LEVEL_LABELS = {
+    'descricao_municipio': 'Município',
+    'microrregiao': 'Microrregião',
+    'macrorregiao': 'Macrorregião',
+    'estado': 'Estado',
+}
+
+STATE = 'São Paulo'
+UNMAPPED = 'Não mapeado'
+
+# Summable per-municipality columns
+COUNT_COLUMNS = [
+    'Total_Condutores', 'EAR', 'Novos_Entrantes', 'Veteranos', 'Soma_Ponderada',
+    'Hub_Total', 'Hub_S', 'Hub_N', 'Bloqueados', 'Mulheres',
+]
+
+
+def load_hierarchy(path, municipalities):
+    """Parent regions of every municipality.
+
+    Args:
+        path (str): CSV with 'codigo_ibge', 'microrregiao' and 'macrorregiao'.
+                    If the file does not exist, every municipality is unmapped.
+        municipalities (pd.DataFrame): Indexed by name with 'codigo_ibge'
+                                       (`utils.load_municipalities`).
+
+    Returns:
+        pd.DataFrame: Indexed by municipality with one column per coarser
+                      level; municipalities missing from the file get `UNMAPPED`.
+
+    Raises:
+        ValueError: If the file lacks a column or repeats a code.
+    """
+    if os.path.exists(path):
+        mapping = pd.read_csv(path, sep=',', dtype={'codigo_ibge': 'Int64'})
+        missing = {'codigo_ibge', *LEVELS[1:-1]} - set(mapping.columns)
+        if missing:
+            raise ValueError(f'Region mapping {path} is missing columns: {sorted(missing)}')
+        if mapping['codigo_ibge'].duplicated().any():
+            raise ValueError(f'Region mapping {path} repeats IBGE codes')
+        mapping = mapping.set_index('codigo_ibge')[LEVELS[1:-1]]
+    else:
+        mapping = pd.DataFrame(columns=LEVELS[1:-1], index=pd.Index([], dtype='Int64', name='codigo_ibge'))
+
+    hierarchy = mapping.reindex(municipalities['codigo_ibge'].astype('Int64')).fillna(UNMAPPED)
+    hierarchy.index = municipalities.index
+    # A micro-region belongs to a single macro-region
+    hierarchy.loc[hierarchy['microrregiao'] == UNMAPPED, 'macrorregiao'] = UNMAPPED
+    hierarchy['estado'] = STATE
+
+    return hierarchy
+
+
+def city_counts(df, segment_counts):
+    """Summable counts per municipality: `aggregates.city_profile` for the risk
+    metrics, `aggregates.hub_rankings` (as 'Hub_*') for the hubs chart, and the
+    blocked and women heavy drivers from `segment_counts` (`segments.segment_matrix`
+    of the same dataset)."""
+    profile = aggregates.city_profile(df)
+    hubs = aggregates.hub_rankings(df).add_prefix('Hub_')
+    heavy = segment_counts.xs(segments.HEAVY_GROUP, level='grupo').drop(segments.STATE, errors='ignore')
+    counts = profile.join(hubs, how='outer').join(heavy[['Bloqueados', 'Mulheres']], how='left')[COUNT_COLUMNS].fillna(0)
+    return counts.astype({col: 'int64' for col in COUNT_COLUMNS if col != 'Soma_Ponderada'})
+
+
+def with_metrics(counts):
+    """Adds 'Idade_Media', 'Status_Risco', 'Indice_Reposicao', 'Pct_EAR',
+    'Pct_Bloqueados' and 'Pct_Mulheres' (shares of 'Hub_Total') to summed counts."""
+    total = counts['Total_Condutores'].where(counts['Total_Condutores'] > 0)
+    veterans = counts['Veteranos'].where(counts['Veteranos'] > 0)
+    heavy = counts['Hub_Total'].where(counts['Hub_Total'] > 0)
+    table = counts.assign(
+        Idade_Media=counts['Soma_Ponderada'] / total,
+        Indice_Reposicao=(counts['Novos_Entrantes'] / veterans).fillna(0.0),
+        Pct_EAR=(counts['EAR'] / total * 100).fillna(0.0),
+        Pct_Bloqueados=counts['Bloqueados'] / heavy * 100,
+        Pct_Mulheres=counts['Mulheres'] / heavy * 100,
+    )
+    table['Status_Risco'] = table['Idade_Media'].apply(aggregates.risk_status)
+    return table
+
+
+def parents_of(hierarchy, cities):
+    """Every level above each of `cities`; cities missing from `hierarchy` are unmapped."""
+    return hierarchy.reindex(cities).fillna(UNMAPPED).assign(estado=STATE)
+
+
+def rollup(counts, hierarchy):
+    """Precomputes every level of the hierarchy.
+
+    Args:
+        counts (pd.DataFrame): `city_counts` of the dataset.
+        hierarchy (pd.DataFrame): `load_hierarchy` of the same municipalities.
+
+    Returns:
+        dict: {level: pd.DataFrame} indexed by the units of that level, with a
+              'pai' column (the unit one level up) and `with_metrics` columns.
+    """
+    parents = parents_of(hierarchy, counts.index)
+
+    levels = {}
+    current = counts
+    for level, parent in zip(LEVELS, LEVELS[1:] + [None]):
+        # Each unit's parent, taken from any of its municipalities
+        unit_of_city = parents.index if level == LEVELS[0] else parents[level]
+        parent_of_unit = parents[parent].groupby(unit_of_city).first() if parent else pd.Series(None, index=current.index, dtype=object)
+        levels[level] = with_metrics(current).assign(pai=parent_of_unit.reindex(current.index))
+        if parent:
+            current = current.groupby(parent_of_unit.reindex(current.index).rename(parent)).sum()
+
+    return levels
+
+
+def build(snapshot):
+    """`rollup` of a dataset snapshot, with the hierarchy read from `REGIONS_PATH`."""
+    # The segment counts are shared with the pages that read them directly
+    counts = city_counts(snapshot.facts, snapshot.derived('segment_matrix', segments.build))
+    return rollup(counts, load_hierarchy(REGIONS_PATH, snapshot.municipalities))
+
+
+def available_levels(levels):
+    """Levels below the state worth offering: those that split it into more
+    than one unit. Without `REGIONS_PATH` every municipality is unmapped, so
+    only the municipality level is left."""
+    return [level for level in LEVELS[:-1] if len(levels[level]) > 1]
+
+
+def children(levels, level, parent=None):
+    """Units of `level`, optionally only those inside `parent` (a unit of the level above)."""
+    table = levels[level]
+    return table if parent is None else table[table['pai'] == parent]
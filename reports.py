@@ -0,0 +1,292 @@
+"""Batch export of one static HTML risk report per municipality.
+
+Each report carries the numbers of the "Apagão Logístico" page for one
+municipality: replacement index, risk status, age pyramid, EAR conversion
+curve and blocked rate, next to the statewide values. The dataset is reduced
+once to a small per-municipality tensor, which is handed to every worker of a
+process pool when it starts; workers then only slice it and render.
+
+Figures are embedded in each page, while plotly.js is written once to the
+output directory and shared by every report.
+
+Usage:
+
+    python reports.py [--data condutores_habilitados_ativos_incrementado.csv] [-o reports] [--workers N]
+"""
+import argparse
+import html
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+
+import aggregates
+import utils
+
+CATEGORY_COLORS = {'C': '#2c3e50', 'D': '#FF5733', 'E': '#D50000'}
+
+_NEW_ENTRANTS = np.isin(utils.AGE_ORDER, aggregates.NEW_ENTRANTS_AGES)
+_VETERANS = np.isin(utils.AGE_ORDER, aggregates.VETERANS_AGES)
+
+# Set in each worker by `_init_worker`
+_aggregate = None
+_filenames = None
+
+
+def report_tensor(df):
+    """Counts heavy drivers per municipality, category, age band, EAR and block status.
+
+    Args:
+        df (pd.DataFrame): Compacted dataset from `utils.read_compacted`.
+
+    Returns:
+        dict: 'cities' (pd.Index), 'counts' with shape (municipalities,
+              len(aggregates.CATEGORIES), len(utils.AGE_ORDER), 2, 2) where the
+              last two axes are EAR and blocked (index 1 = 'S'), and 'risk', the
+              `aggregates.city_risk_table` indexed by municipality.
+    """
+    cities, counts = aggregates.heavy_tensor(df, ('exerce_atividade_remunerada', 'condutor_bloqueado'))
+    heavy = aggregates.alert_scope(df)
+
+    return {
+        'cities': cities,
+        'counts': counts,
+        'risk': aggregates.city_risk_table(heavy[heavy['faixa_etaria'].isin(utils.AGE_ORDER)]).set_index('descricao_municipio'),
+    }
+
+
+def slugify(name):
+    """File-system friendly name: 'SÃO JOSÉ DOS CAMPOS' -> 'sao-jose-dos-campos'."""
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-')
+
+
+def report_filenames(cities):
+    """File name of each municipality's report, in the order of `cities`.
+
+    Names that slugify alike (or to 'index', the index page) get a '-2',
+    '-3', ... suffix, so no report overwrites another.
+    """
+    taken = {'index'}
+    filenames = []
+    for city in cities:
+        slug = base = slugify(city) or 'municipio'
+        suffix = 1
+        while slug in taken:
+            suffix += 1
+            slug = f'{base}-{suffix}'
+        taken.add(slug)
+        filenames.append(f'{slug}.html')
+    return filenames
+
+
+def summary(counts):
+    """Headline numbers of a (categories, bands, ear, blocked) block of the tensor."""
+    by_band = counts.sum(axis=(0, 2, 3))
+    total = by_band.sum()
+    veterans = by_band[_VETERANS].sum()
+    return {
+        'total': total,
+        'indice_reposicao': by_band[_NEW_ENTRANTS].sum() / veterans if veterans > 0 else 0.0,
+        'pct_ear': counts[..., 1, :].sum() / total * 100 if total > 0 else 0.0,
+        'pct_bloqueados': counts[..., 1].sum() / total * 100 if total > 0 else 0.0,
+    }
+
+
+def pyramid_figure(counts):
+    """Heavy drivers per age band, stacked by category."""
+    by_category = counts.sum(axis=(2, 3))
+    fig = go.Figure()
+    for idx, category in enumerate(aggregates.CATEGORIES):
+        fig.add_trace(go.Bar(
+            y=utils.AGE_ORDER, x=by_category[idx], orientation='h',
+            name=f'Categoria {category}', marker_color=CATEGORY_COLORS[category],
+            hovertemplate='%{y}: <b>%{x:,.0f}</b><extra></extra>'
+        ))
+    fig.update_layout(
+        title='Pirâmide Etária dos Motoristas Pesados',
+        barmode='stack',
+        xaxis=dict(title='Quantidade de Condutores'),
+        yaxis=dict(title='Faixa Etária'),
+        legend=dict(orientation="h", y=1.1, x=0.5, xanchor='center'),
+        height=450,
+        margin=dict(l=20, r=20, t=80, b=20)
+    )
+    return fig
+
+
+def ear_figure(counts):
+    """Same dual-axis chart as the EAR block of the "Apagão Logístico" page."""
+    by_band = counts.sum(axis=(0, 3))
+    total = by_band.sum(axis=1)
+    pct_ear = np.divide(by_band[:, 1] * 100, total, out=np.zeros_like(total), where=total > 0)
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=utils.AGE_ORDER, y=total,
+        name='Total de Condutores', marker_color='#2c3e50'
+    ))
+    fig.add_trace(go.Scatter(
+        x=utils.AGE_ORDER, y=pct_ear,
+        name='% Conversão EAR', yaxis='y2',
+        mode='lines+markers+text',
+        line=dict(color='#D50000', width=3),
+        text=[f'{x:.0f}%' for x in pct_ear],
+        textposition='top center',
+        hovertemplate='&#37; Conversão EAR: <b>%{y:.0f}%</b><extra></extra>'
+    ))
+    fig.update_layout(
+        title='Conversão Profissional: Volume vs Taxa de Atividade',
+        xaxis=dict(title='Faixa Etária', tickangle=-45),
+        yaxis=dict(title='Quantidade de Condutores'),
+        yaxis2=dict(title='% Conversão EAR', overlaying='y', side='right', range=[0, 115], showgrid=False),
+        legend=dict(orientation="h", y=1.1, x=0.5, xanchor='center'),
+        height=500,
+        hovermode='x unified',
+        margin=dict(l=20, r=20, t=80, b=100)
+    )
+    return fig
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="plotly.min.js"></script>
+<style>
+    body {{ font-family: sans-serif; max-width: 960px; margin: 2rem auto; color: #31333F; }}
+    .cards {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem; }}
+    .card {{ background-color: #f0f2f6; border-radius: 10px; padding: 1rem; }}
+    .card b {{ display: block; font-size: 1.6rem; color: #0e1117; }}
+    .card small {{ color: #6b6f7b; }}
+    table {{ border-collapse: collapse; width: 100%; }}
+    td, th {{ border-bottom: 1px solid #e6e9ef; padding: .4rem; text-align: left; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def _card(label, value, baseline):
+    return f'<div class="card">{label}<b>{value}</b><small>{baseline}</small></div>'
+
+
+def render_report(city, counts, risk, state):
+    """HTML report for one municipality."""
+    local = summary(counts)
+    cards = ''.join([
+        _card('Índice de Reposição', f"{local['indice_reposicao']:.2f}", f"Estado: {state['indice_reposicao']:.2f}"),
+        _card('Idade Média', f"{risk['Idade_Media']:.1f} anos", risk['Status_Risco']),
+        _card('Condutores Bloqueados', f"{local['pct_bloqueados']:.1f}%", f"Estado: {state['pct_bloqueados']:.1f}%"),
+        _card('Profissionais (EAR)', f"{local['pct_ear']:.1f}%", f"Estado: {state['pct_ear']:.1f}%"),
+    ])
+    total_label = f"{local['total']:,.0f}".replace(',', '.')
+    body = (
+        f'<p><a href="index.html">← Todos os municípios</a></p>'
+        f'<h1>Apagão Logístico: {html.escape(city)}</h1>'
+        f'<p>{total_label} condutores habilitados nas categorias C, D e E.</p>'
+        f'<div class="cards">{cards}</div>'
+        + pyramid_figure(counts).to_html(full_html=False, include_plotlyjs=False)
+        + ear_figure(counts).to_html(full_html=False, include_plotlyjs=False)
+    )
+    return PAGE_TEMPLATE.format(title=f'Relatório de Risco: {html.escape(city)}', body=body)
+
+
+def render_index(rows):
+    """Index page listing every report, oldest workforce first."""
+    lines = ''.join(
+        f'<tr><td><a href="{filename}">{html.escape(city)}</a></td><td>{mean_age:.1f}</td><td>{status}</td></tr>'
+        for city, filename, mean_age, status in rows
+    )
+    body = (
+        '<h1>Relatórios de Risco por Município</h1>'
+        f'<table><tr><th>Município</th><th>Idade Média</th><th>Nível de Alerta</th></tr>{lines}</table>'
+    )
+    return PAGE_TEMPLATE.format(title='Relatórios de Risco', body=body)
+
+
+def _init_worker(aggregate, filenames):
+    global _aggregate, _filenames
+    _aggregate = aggregate
+    _filenames = filenames
+
+
+def _export_batch(positions, out_dir):
+    """Renders and writes the reports of the municipalities at `positions`; returns bytes written."""
+    cities, counts, risk = _aggregate['cities'], _aggregate['counts'], _aggregate['risk']
+    state = summary(counts.sum(axis=0))
+
+    written = 0
+    for position in positions:
+        city = cities[position]
+        report = render_report(city, counts[position], risk.loc[city], state).encode('utf-8')
+        with open(os.path.join(out_dir, _filenames[position]), 'wb') as f:
+            f.write(report)
+        written += len(report)
+    return written
+
+
+def export_reports(aggregate, out_dir, workers=None, batch_size=16):
+    """Writes one report per municipality plus an index page to `out_dir`.
+
+    Args:
+        aggregate (dict): Output of `report_tensor`.
+        out_dir (str): Output directory, created if needed.
+        workers (int, optional): Worker processes. Defaults to the CPU count.
+        batch_size (int): Municipalities rendered per task.
+
+    Returns:
+        tuple: Number of reports and bytes written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+    filenames = report_filenames(aggregate['cities'])
+    batches = [range(start, min(start + batch_size, len(aggregate['cities']))) for start in range(0, len(aggregate['cities']), batch_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(aggregate, filenames)) as pool:
+        written = sum(pool.map(_export_batch, batches, [out_dir] * len(batches)))
+
+    filename_of = dict(zip(aggregate['cities'], filenames))
+    rows = [
+        (city, filename_of[city], row.Idade_Media, row.Status_Risco)
+        for city, row in aggregate['risk'].iterrows()
+    ]
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(render_index(rows))
+
+    return len(aggregate['cities']), written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exports one static HTML risk report per municipality.')
+    parser.add_argument('--data', default=utils.DATA_PATH, help='Enriched Detran extract')
+    parser.add_argument('-o', '--output', default='reports', help='Output directory')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    aggregate = report_tensor(utils.read_compacted(args.data)[0])
+    prepared = time.perf_counter()
+
+    count, written = export_reports(aggregate, args.output, args.workers)
+    elapsed = time.perf_counter() - prepared
+
+    print(f'Agregado preparado em {prepared - start:.1f}s')
+    print(
+        f'{count} relatórios ({written / 1024**2:.1f} MB) em {args.output}/ em {elapsed:.1f}s '
+        f'({count / elapsed:.1f} relatórios/s com {args.workers or os.cpu_count()} processos)'
+    )
+
+
+if __name__ == '__main__':
+    main()
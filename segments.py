@@ -0,0 +1,108 @@
+"""Segment shares by category group and municipality, computed in one pass.
+
+A segment is a set of conditions on the dimension columns (e.g. women with
+EAR). `segment_matrix` counts every segment for every (municipality,
+category group) pair with a single grouped sum over the dataset, adds the
+heavy-categories group and the statewide rows, and the pages index into it.
+"""
+import numpy as np
+import pandas as pd
+
+import utils
+
+STATE = 'Todo o estado'
+
+WOMEN = ['MULHER', 'FEMININO', 'F']
+
+# Category groups: B alone (cars) and the simplified heavy categories
+GROUPS = ['B', 'C', 'D', 'E']
+HEAVY_GROUP = 'Pesados'
+
+# Segment name -> {column: accepted values}; a row belongs to the segment
+# when it matches every condition
+SEGMENTS = {
+    'Mulheres': {'genero': WOMEN},
+    'Mulheres com EAR': {'genero': WOMEN, 'exerce_atividade_remunerada': ['S']},
+    'PCD': {'pessoa_com_deficiencia': ['S']},
+    'PCD com EAR': {'pessoa_com_deficiencia': ['S'], 'exerce_atividade_remunerada': ['S']},
+    'Bloqueados': {'condutor_bloqueado': ['S']},
+    'EAR': {'exerce_atividade_remunerada': ['S']},
+    **{band: {'faixa_etaria': [band]} for band in utils.AGE_ORDER},
+}
+
+
+def _group_of(category):
+    if category == 'B':
+        return 'B'
+    if category in utils.HEAVY_CATEGORIES:
+        return utils.simplify_category(category)
+    return None
+
+
+def _codes_lookup(series, accepted):
+    """Boolean per category code, with an extra False at the end for missing values (code -1)."""
+    return np.append(np.isin(series.cat.categories, accepted), False)
+
+
+def segment_matrix(df, segments=SEGMENTS):
+    """Drivers in each segment per municipality and category group.
+
+    Args:
+        df (pd.DataFrame): Compacted dataset from `utils.load_data`.
+        segments (dict): Segment definitions, see `SEGMENTS`.
+
+    Returns:
+        pd.DataFrame: Indexed by ('descricao_municipio', 'grupo'), with a
+                      'Total' column and one count column per segment. Groups
+                      are `GROUPS` plus `HEAVY_GROUP`; `STATE` holds the
+                      statewide rows.
+    """
+    group_lookup = np.array([
+        GROUPS.index(group) if (group := _group_of(cat)) else -1
+        for cat in df['categoria_cnh'].cat.categories
+    ] + [-1])
+    groups = group_lookup[df['categoria_cnh'].cat.codes.to_numpy()]
+    cities = df['descricao_municipio'].cat.codes.to_numpy()
+    in_scope = (groups >= 0) & (cities >= 0)
+
+    qtd = df['qtd_condutores'].to_numpy()
+    weights = {'Total': qtd}
+    for name, conditions in segments.items():
+        mask = np.ones(len(df), dtype=bool)
+        for col, accepted in conditions.items():
+            mask &= _codes_lookup(df[col], accepted)[df[col].cat.codes.to_numpy()]
+        weights[name] = np.where(mask, qtd, 0)
+
+    # The single grouped pass: every segment summed per (city, group) key.
+    # ravel_multi_index works in int64; the category codes may be int8
+    city_names = list(df['descricao_municipio'].cat.categories)
+    shape = (len(city_names), len(GROUPS))
+    keys = np.ravel_multi_index((cities[in_scope], groups[in_scope]), shape)
+    counts = pd.DataFrame({name: values[in_scope] for name, values in weights.items()}).groupby(keys).sum()
+
+    city_codes, group_codes = np.unravel_index(counts.index.to_numpy(), shape)
+    counts.index = pd.MultiIndex.from_arrays(
+        [np.array(city_names)[city_codes], np.array(GROUPS)[group_codes]],
+        names=['descricao_municipio', 'grupo']
+    )
+    counts = counts.reindex(pd.MultiIndex.from_product([city_names, GROUPS], names=counts.index.names), fill_value=0)
+
+    heavy = counts.loc[(slice(None), ['C', 'D', 'E']), :].groupby(level='descricao_municipio').sum()
+    heavy.index = pd.MultiIndex.from_product([heavy.index, [HEAVY_GROUP]], names=counts.index.names)
+    counts = pd.concat([counts, heavy])
+
+    state = counts.groupby(level='grupo').sum()
+    state.index = pd.MultiIndex.from_product([[STATE], state.index], names=counts.index.names)
+
+    return pd.concat([state, counts]).sort_index()
+
+
+def build(snapshot):
+    """`segment_matrix` of a dataset snapshot, with the default `SEGMENTS`."""
+    return segment_matrix(snapshot.facts)
+
+
+def shares(matrix):
+    """Fraction of each row's 'Total' in every segment (0 where the total is 0)."""
+    totals = matrix['Total'].replace(0, np.nan)
+    return matrix.drop(columns='Total').div(totals, axis=0).fillna(0.0)
@@ -0,0 +1,338 @@
+"""Static snapshot of the dashboard's default views.
+
+Runs every page once through Streamlit's headless testing API, exactly as a
+first-time visitor would see it, and writes what was rendered (text, KPIs,
+Plotly figures, folium maps and tables) as static HTML plus a JSON
+description of each page. A plain static file server can then absorb the
+traffic of readers, and only visitors who change a filter go to the live app:
+every widget in the snapshot links to its page in the app.
+
+Each dataset version is rendered once, into its own directory; `index.html`
+and `latest.json` at the top of the output directory point to the newest one.
+
+Usage (from the repository root, next to the dataset):
+
+    python snapshot.py [-o snapshots] [--app-url https://painel.example.org] [--keep 2] [--force]
+    python -m http.server -d snapshots
+"""
+import argparse
+import html
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+from markdown_it import MarkdownIt
+from plotly.offline import get_plotlyjs
+from streamlit.testing.v1 import AppTest
+
+import utils
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Page script -> title, from the navigation of the app; the first one is the home page
+PAGES = {page: title for page, title, _ in utils.PAGES}
+
+# First runs parse the dataset
+TIMEOUT = 600
+
+# CommonMark, as Streamlit renders it; raw HTML passes through as with unsafe_allow_html
+MARKDOWN = MarkdownIt('commonmark', {'html': True}).enable(['table', 'strikethrough'])
+
+WIDGET_TYPES = ['selectbox', 'multiselect', 'slider', 'toggle', 'checkbox', 'radio', 'download_button']
+
+
+def page_name(page):
+    """URL path of a page in the live app ('pages/Overview.py' -> 'Overview'); '' for the home page."""
+    return '' if page == next(iter(PAGES)) else os.path.splitext(os.path.basename(page))[0]
+
+
+def page_file(name):
+    return f'{name}.html' if name else 'index.html'
+
+
+def _widget_value(node, kind):
+    if kind == 'multiselect':
+        return ', '.join(map(str, node.value))
+    if kind in ('toggle', 'checkbox'):
+        return 'Sim' if node.value else 'Não'
+    if kind == 'download_button':
+        return None
+    return str(node.value)
+
+
+def extract(node, maps):
+    """Describes a rendered element (and its children) as plain dicts.
+
+    Args:
+        node: Element of the AppTest element tree.
+        maps (list): Collects the `st_folium` arguments of each map; elements
+                     refer to maps by position in this list.
+
+    Returns:
+        dict | None: The element, or None for elements without a static form.
+    """
+    kind = getattr(node, 'type', None)
+    children = getattr(node, 'children', None)
+    if isinstance(children, dict):
+        items = [item for child in children.values() if (item := extract(child, maps)) is not None]
+        if kind == 'expander':
+            return {'type': 'expander', 'label': node.proto.label, 'expanded': node.proto.expanded, 'children': items}
+        if kind == 'tab':
+            return {'type': 'tab', 'label': node.proto.label, 'children': items}
+        if kind == 'tab_container':
+            return {'type': 'tabs', 'children': items}
+        if kind == 'column':
+            return {'type': 'column', 'weight': node.proto.weight, 'children': items}
+        if kind == 'flex_container' and node.proto.flex_container.direction == node.proto.flex_container.HORIZONTAL:
+            return {'type': 'row', 'children': items}
+        return {'type': 'container', 'children': items} if items else None
+
+    if kind in ('title', 'header', 'subheader', 'markdown', 'caption'):
+        return {'type': kind, 'body': node.value}
+    if kind in ('info', 'warning', 'error', 'success'):
+        return {'type': 'alert', 'level': kind, 'body': node.value}
+    if kind == 'divider':
+        return {'type': 'divider'}
+    if kind == 'metric':
+        proto = node.proto
+        return {
+            'type': 'metric', 'label': proto.label, 'value': proto.body, 'delta': proto.delta or None,
+            'color': proto.MetricColor.Name(proto.color).lower(), 'help': proto.help or None,
+        }
+    if kind == 'plotly_chart':
+        return {'type': 'plotly', 'spec': json.loads(node.proto.spec)}
+    if kind in ('arrow_data_frame', 'arrow_table'):
+        return {'type': 'table', 'data': json.loads(node.value.to_json(orient='split', index=False, force_ascii=False))}
+    if kind == 'page_link':
+        return {'type': 'page_link', 'label': node.proto.label, 'icon': node.proto.icon, 'page': node.proto.page}
+    if kind in WIDGET_TYPES:
+        return {'type': 'widget', 'widget': kind, 'label': node.proto.label, 'value': _widget_value(node, kind)}
+    if kind == 'component_instance' and node.proto.component_name == 'streamlit_folium.st_folium':
+        maps.append(json.loads(node.proto.json_args))
+        return {'type': 'map', 'map': len(maps) - 1, 'height': maps[-1]['height']}
+    return None
+
+
+def render_map(args):
+    """Standalone HTML of a folium map from the arguments passed to the `st_folium` component."""
+    links = ''.join(f'<link rel="stylesheet" href="{href}"/>' for href in args['css_links'])
+    links += ''.join(f'<script src="{src}"></script>' for src in args['js_links'])
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8">{links}{args["header"]}'
+        '<style>html, body { margin: 0; height: 100%; }</style></head>'
+        f'<body><div id="{args["id"]}" style="width: 100%; height: 100%;"></div>{args["html"]}'
+        f'<script>{args["script"]}</script></body></html>'
+    )
+
+
+class HtmlRenderer:
+    """Turns the extracted elements of one page into HTML."""
+
+    def __init__(self, name, app_url):
+        self.name = name
+        self.app_url = app_url.rstrip('/')
+        self._figures = 0
+
+    def live_link(self, text='Alterar no painel interativo →'):
+        return f'<a class="live" href="{html.escape(f"{self.app_url}/{self.name}")}">{text}</a>'
+
+    def render(self, element):
+        kind = element['type']
+        if kind in ('container', 'tab'):
+            body = self.render_all(element['children'])
+            return f'<section><h3>{html.escape(element["label"])}</h3>{body}</section>' if kind == 'tab' else body
+        if kind == 'tabs':
+            return f'<div class="tabs">{self.render_all(element["children"])}</div>'
+        if kind == 'row':
+            return f'<div class="row">{self.render_all(element["children"])}</div>'
+        if kind == 'column':
+            return f'<div class="column" style="flex: {element["weight"]}">{self.render_all(element["children"])}</div>'
+        if kind == 'expander':
+            opened = ' open' if element['expanded'] else ''
+            return f'<details{opened}><summary>{html.escape(element["label"])}</summary>{self.render_all(element["children"])}</details>'
+        if kind in ('title', 'header', 'subheader'):
+            tag = {'title': 'h1', 'header': 'h2', 'subheader': 'h3'}[kind]
+            return f'<{tag}>{html.escape(element["body"])}</{tag}>'
+        if kind in ('markdown', 'caption'):
+            return f'<div class="md {kind}">{_markdown(element["body"])}</div>'
+        if kind == 'alert':
+            return f'<div class="md alert {element["level"]}">{_markdown(element["body"])}</div>'
+        if kind == 'divider':
+            return '<hr>'
+        if kind == 'metric':
+            delta = f'<span class="delta {element["color"]}">{html.escape(element["delta"])}</span>' if element['delta'] else ''
+            title = f' title="{html.escape(element["help"])}"' if element['help'] else ''
+            return f'<div class="metric"{title}><span>{html.escape(element["label"])}</span><b>{html.escape(element["value"])}</b>{delta}</div>'
+        if kind == 'plotly':
+            self._figures += 1
+            spec = json.dumps(element['spec'], ensure_ascii=False).replace('</', '<\\/')
+            div = f'fig-{self._figures}'
+            return (
+                f'<div id="{div}" class="plotly"></div><script>(function () {{ const spec = {spec};'
+                f' Plotly.newPlot("{div}", spec.data, spec.layout, {{responsive: true, displaylogo: false}}); }})();</script>'
+            )
+        if kind == 'table':
+            table = pd.DataFrame(element['data']['data'], columns=element['data']['columns'])
+            return table.to_html(index=False, float_format=lambda x: f'{x:,.2f}', classes='table', border=0)
+        if kind == 'page_link':
+            return f'<p><a href="{page_file(element["page"])}">{html.escape(element["icon"])} {html.escape(element["label"])}</a></p>'
+        if kind == 'widget':
+            value = f': <b>{html.escape(element["value"])}</b>' if element['value'] else ''
+            return f'<div class="widget">{html.escape(element["label"])}{value} {self.live_link()}</div>'
+        if kind == 'map':
+            return f'<iframe class="map" src="maps/{self.name or "Home"}-{element["map"]}.html" height="{element["height"]}" loading="lazy"></iframe>'
+        return ''
+
+    def render_all(self, elements):
+        return ''.join(self.render(element) for element in elements)
+
+
+def _markdown(text):
+    # Rendered here, so the snapshot needs no script from a CDN
+    return MARKDOWN.render(text)
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<script src="plotly.min.js"></script>
+<style>
+    body {{ font-family: sans-serif; max-width: 960px; margin: 0 auto 3rem; padding: 0 1rem; color: #31333F; }}
+    nav {{ display: flex; flex-wrap: wrap; gap: 1rem; padding: .8rem 0; border-bottom: 1px solid #e6e9ef; }}
+    .banner {{ background: #f0f2f6; padding: .6rem 1rem; border-radius: 8px; margin: 1rem 0; font-size: .9rem; }}
+    .row {{ display: flex; flex-wrap: wrap; gap: 1rem; }}
+    .column {{ min-width: 180px; }}
+    .metric span {{ font-size: .9rem; }}
+    .metric b {{ display: block; font-size: 2rem; font-weight: 400; }}
+    .delta {{ font-size: .9rem; }}
+    .delta.green {{ color: #09ab3b; }} .delta.red {{ color: #ff2b2b; }} .delta.gray {{ color: #808495; }}
+    .alert {{ padding: .8rem 1rem; border-radius: 8px; margin: .5rem 0; }}
+    .alert.info {{ background: #e8f1fb; }} .alert.warning {{ background: #fffce7; }}
+    .alert.error {{ background: #ffecec; }} .alert.success {{ background: #e8f9ee; }}
+    .caption {{ font-size: .85rem; color: #808495; }}
+    .widget {{ padding: .5rem .8rem; border: 1px dashed #d0d3da; border-radius: 8px; margin: .5rem 0; }}
+    .live {{ font-size: .85rem; margin-left: .5rem; }}
+    .map {{ width: 100%; border: 0; }}
+    .table {{ border-collapse: collapse; width: 100%; font-size: .85rem; }}
+    .table td, .table th {{ border-bottom: 1px solid #e6e9ef; padding: .3rem; text-align: left; }}
+    details {{ border: 1px solid #e6e9ef; border-radius: 8px; padding: .5rem 1rem; margin: .5rem 0; }}
+</style>
+</head>
+<body>
+<nav>{nav}</nav>
+<div class="banner">Versão estática gerada em {generated} (dados <code>{version}</code>). {live}</div>
+{body}
+</body>
+</html>
+"""
+
+
+def render_site():
+    """Renders every page in its default state.
+
+    Returns:
+        dict: {page name: (elements, maps)}.
+    """
+    site = {}
+    at = AppTest.from_file(os.path.join(ROOT, 'streamlit_app.py'), default_timeout=TIMEOUT)
+    for page in PAGES:
+        at.switch_page(page).run()
+        if at.exception:
+            raise RuntimeError(f'{page} raised: {at.exception[0].message}')
+        maps = []
+        main = extract(at.main, maps)
+        site[page_name(page)] = (main['children'] if main else [], maps)
+    return site
+
+
+def write_snapshot(site, out_dir, version, app_url):
+    """Writes the pages of one dataset version to `out_dir/version`, then points the top-level index to it."""
+    generated = datetime.now(timezone.utc)
+    target = os.path.join(out_dir, version)
+    staging = f'{target}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, 'maps'))
+
+    with open(os.path.join(staging, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+    titles = {page_name(page): title for page, title in PAGES.items()}
+    nav = ''.join(f'<a href="{page_file(name)}">{html.escape(title)}</a>' for name, title in titles.items())
+
+    for name, (elements, maps) in site.items():
+        renderer = HtmlRenderer(name, app_url)
+        page_html = PAGE_TEMPLATE.format(
+            title=titles[name], nav=nav, version=version,
+            generated=f'{generated:%d/%m/%Y %H:%M} (UTC)',
+            live=renderer.live_link('Abrir o painel interativo →'),
+            body=renderer.render_all(elements),
+        )
+        with open(os.path.join(staging, page_file(name)), 'w', encoding='utf-8') as f:
+            f.write(page_html)
+        with open(os.path.join(staging, f'{name or "Home"}.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'page': name, 'elements': elements}, f, ensure_ascii=False)
+        for position, args in enumerate(maps):
+            with open(os.path.join(staging, 'maps', f'{name or "Home"}-{position}.html'), 'w', encoding='utf-8') as f:
+                f.write(render_map(args))
+
+    manifest = {'version': version, 'generated_at': generated.isoformat(), 'pages': [page_file(name) for name in site]}
+    with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+
+    # Swap the entry points last, so readers never land on a half-written version
+    _write_atomic(os.path.join(out_dir, 'latest.json'), json.dumps(manifest))
+    _write_atomic(
+        os.path.join(out_dir, 'index.html'),
+        f'<!DOCTYPE html><meta charset="utf-8"><meta http-equiv="refresh" content="0; url={version}/index.html">'
+        f'<a href="{version}/index.html">Painel</a>'
+    )
+    return manifest
+
+
+def _write_atomic(path, content):
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(f'{path}.tmp', path)
+
+
+def prune(out_dir, keep):
+    """Removes all but the `keep` most recent versions."""
+    versions = sorted(
+        (entry for entry in os.scandir(out_dir) if entry.is_dir() and os.path.exists(os.path.join(entry.path, 'manifest.json'))),
+        key=lambda entry: entry.stat().st_mtime, reverse=True
+    )
+    for entry in versions[keep:]:
+        shutil.rmtree(entry.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Renders the default view of every page to static HTML/JSON.')
+    parser.add_argument('-o', '--output', default='snapshots', help='Output directory')
+    parser.add_argument('--app-url', default='http://localhost:8501', help='Live app that widgets link to')
+    parser.add_argument('--keep', type=int, default=2, help='Dataset versions kept in the output directory')
+    parser.add_argument('--force', action='store_true', help='Render again even if this version exists')
+    args = parser.parse_args()
+
+    version = utils.dataset_version(utils.DATA_PATH)
+    if not args.force and os.path.exists(os.path.join(args.output, version, 'manifest.json')):
+        print(f'Versão {version} já publicada em {args.output}/{version}/')
+        return
+
+    start = time.perf_counter()
+    site = render_site()
+    manifest = write_snapshot(site, args.output, version, args.app_url)
+    prune(args.output, args.keep)
+    print(f"{len(manifest['pages'])} páginas da versão {version} em {args.output}/{version}/ ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Spatial index over the municipality centroids.
+
+Centroids are stored as points on the unit sphere in a KD-tree, where the
+straight-line (chord) distance grows monotonically with the great-circle
+distance. Radius and nearest-neighbour queries therefore run on the tree
+with exact haversine semantics, instead of scanning every municipality.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+import aggregates
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _chord(distance_km):
+    return 2 * np.sin(np.asarray(distance_km) / (2 * EARTH_RADIUS_KM))
+
+
+def _arc_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+class SpatialIndex:
+    """Radius and k-nearest queries on municipality centroids.
+
+    Args:
+        municipalities (pd.DataFrame): Indexed by municipality name with 'lat'
+                                       and 'lon' (`utils.load_municipalities`).
+                                       Rows without coordinates are skipped.
+    """
+
+    def __init__(self, municipalities):
+        located = municipalities.dropna(subset=['lat', 'lon'])
+        self.cities = pd.Index(located.index.astype(str), name='descricao_municipio')
+        self.coords = located[['lat', 'lon']].to_numpy(dtype=float)
+        self._tree = cKDTree(_unit_vectors(self.coords[:, 0], self.coords[:, 1]))
+
+    def location(self, city):
+        """(lat, lon) of a municipality."""
+        return tuple(self.coords[self.cities.get_loc(city)])
+
+    def within(self, lat, lon, radius_km):
+        """Municipalities whose centroid lies within `radius_km` of (lat, lon).
+
+        Returns:
+            pd.Series: Distance in km, indexed by municipality, nearest first.
+        """
+        point = _unit_vectors(lat, lon)[0]
+        positions = np.asarray(self._tree.query_ball_point(point, _chord(radius_km)), dtype=int)
+        distances = _arc_km(np.linalg.norm(self._tree.data[positions] - point, axis=1))
+        return self._series(positions, distances)
+
+    def nearest(self, lat, lon, k, where=None):
+        """The `k` municipalities nearest to (lat, lon).
+
+        Args:
+            k (int): Number of municipalities.
+            where (pd.Series, optional): Boolean per municipality; only those
+                                         flagged True are returned.
+
+        Returns:
+            pd.Series: Distance in km, indexed by municipality, nearest first.
+        """
+        point = _unit_vectors(lat, lon)[0]
+        allowed = None if where is None else where.reindex(self.cities, fill_value=False).to_numpy()
+
+        # With a filter, widen the search until enough allowed cities are found
+        candidates = k
+        while True:
+            candidates = min(candidates, len(self.cities))
+            chords, positions = self._tree.query(point, k=candidates)
+            chords, positions = np.atleast_1d(chords), np.atleast_1d(positions)
+            if allowed is not None:
+                keep = allowed[positions]
+                chords, positions = chords[keep], positions[keep]
+            if len(positions) >= k or candidates == len(self.cities):
+                return self._series(positions[:k], _arc_km(chords[:k]))
+            candidates *= 4
+
+    def _series(self, positions, distances):
+        series = pd.Series(distances, index=self.cities[positions], name='distancia_km')
+        return series.sort_values(kind='stable')
+
+
+def catchment(profile, distances):
+    """Adds up the drivers of a set of municipalities.
+
+    Args:
+        profile (pd.DataFrame): Output of `aggregates.city_profile`.
+        distances (pd.Series): Municipalities in the catchment (from
+                               `SpatialIndex.within` or `nearest`).
+
+    Returns:
+        tuple: The per-municipality rows with their distance, and a dict with
+               'municipios', 'total_condutores', 'ear', 'idade_media',
+               'indice_reposicao' and 'status_risco' for the whole catchment.
+    """
+    rows = profile.reindex(distances.index).dropna(subset=['Total_Condutores']).assign(distancia_km=distances)
+    total = rows['Total_Condutores'].sum()
+    veterans = rows['Veteranos'].sum()
+    mean_age = rows['Soma_Ponderada'].sum() / total if total > 0 else 0.0
+
+    return rows, {
+        'municipios': len(rows),
+        'total_condutores': int(total),
+        'ear': int(rows['EAR'].sum()),
+        'idade_media': float(mean_age),
+        'indice_reposicao': float(rows['Novos_Entrantes'].sum() / veterans) if veterans > 0 else 0.0,
+        'status_risco': aggregates.risk_status(mean_age),
+    }
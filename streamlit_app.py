@@ -1,12 +1,10 @@
 import streamlit as st
 
+import utils
+
 # Page configuration (must be the first thing in Streamlit)
 st.set_page_config(page_title='Logistica Pesada SP', page_icon='🚗', layout='wide')
 
-pg = st.navigation([
-    st.Page("pages/Home.py", title="Início", icon="🏠"),
-    st.Page("pages/Overview.py", title="Panorama Geral", icon="📊"),
-    st.Page("pages/LogisticsBlackout.py", title="Apagão Logístico", icon="📉"),
-    st.Page("pages/About_Data.py", title="Sobre os Dados", icon="💾")
-])
+# The page list is shared with snapshot.py
+pg = st.navigation([st.Page(page, title=title, icon=icon) for page, title, icon in utils.PAGES])
 pg.run()
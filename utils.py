@@ -1,5 +1,85 @@
+import glob
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import dataset
+from dataset import DatasetManager
+
+DATA_PATH = 'condutores_habilitados_ativos_incrementado.csv'
+
+# Pages of the app in navigation order: (script, title, icon); the first one is the home page
+PAGES = [
+    ('pages/Home.py', 'Início', '🏠'),
+    ('pages/Overview.py', 'Panorama Geral', '📊'),
+    ('pages/LogisticsBlackout.py', 'Apagão Logístico', '📉'),
+    ('pages/Projection.py', 'Projeção', '🔮'),
+    ('pages/Catchment.py', 'Área de Influência', '📍'),
+    ('pages/Deltas.py', 'Variação Mensal', '📈'),
+    ('pages/Leaderboard.py', 'Ranking de Municípios', '🏆'),
+    ('pages/About_Data.py', 'Sobre os Dados', '💾'),
+]
+
+# Low-cardinality columns, dictionary-encoded while parsing so they arrive in
+# pandas as categoricals instead of object strings.
+DIMENSION_COLUMNS = [
+    'descricao_municipio',
+    'categoria_cnh',
+    'faixa_etaria',
+    'genero',
+    'pessoa_com_deficiencia',
+    'exerce_atividade_remunerada',
+    'condutor_bloqueado',
+]
+
+# The extract's schema never changes, so the parser gets explicit types and
+# skips inference altogether.
+SCHEMA = {
+    **{col: pa.dictionary(pa.int32(), pa.string()) for col in DIMENSION_COLUMNS},
+    'qtd_condutores': pa.int64(),
+    'mes_ref': pa.int16(),
+    'ano_ref': pa.int16(),
+    'codigo_ibge': pa.int32(),
+    'lat': pa.float64(),
+    'lon': pa.float64(),
+    'regiao': pa.dictionary(pa.int32(), pa.string()),
+}
+
+PROFILE_TYPES = ['Amador', 'Logística Pesada/Tradicional', 'Gig Economy/Apps', 'Outros']
+
+INVALID_AGE_GROUPS = ['101-120 ANOS', '+120 ANOS']
+
+# Valid age bands in chronological order, with their inclusive bounds in years
+AGE_ORDER = [
+    '18-21 ANOS', '22-25 ANOS', '26-30 ANOS', '31-40 ANOS',
+    '41-50 ANOS', '51-60 ANOS', '61-70 ANOS', '71-80 ANOS',
+    '81-90 ANOS', '91-100 ANOS'
+]
+AGE_MIDPOINTS = {
+    '18-21 ANOS': 19.5, '22-25 ANOS': 23.5, '26-30 ANOS': 28.0,
+    '31-40 ANOS': 35.5, '41-50 ANOS': 45.5, '51-60 ANOS': 55.5,
+    '61-70 ANOS': 65.5, '71-80 ANOS': 75.5, '81-90 ANOS': 85.5,
+    '91-100 ANOS': 95.5
+}
+AGE_BOUNDS = {band: tuple(int(age) for age in band.split()[0].split('-')) for band in AGE_ORDER}
+
+# Heavy vehicle licences (C, D, E and their combinations with A)
+HEAVY_CATEGORIES = ['C', 'D', 'E', 'AC', 'AD', 'AE']
+
+
+def simplify_category(cat):
+    """Collapses a heavy CNH category into its highest class ('C', 'D' or 'E')."""
+    if 'E' in cat: return 'E'
+    if 'D' in cat: return 'D'
+    return 'C'
 
 
 def classify_profile(row):
@@ -30,13 +110,349 @@ def classify_profile(row):
     return 'Outros'
 
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv('condutores_habilitados_ativos_incrementado.csv', sep=',')
+def classify_profiles(df):
+    """Vectorized version of `classify_profile` for categorical frames.
+
+    The profile only depends on the (EAR, category) pair, so it is resolved
+    once per pair of categories and broadcast to the rows through their codes.
+
+    Args:
+        df (pd.DataFrame): Frame with categorical 'exerce_atividade_remunerada'
+                           and 'categoria_cnh' columns.
+
+    Returns:
+        pd.Categorical: The profile type of each row.
+    """
+    ear = df['exerce_atividade_remunerada'].cat
+    cat = df['categoria_cnh'].cat
+
+    lookup = np.array([
+        [PROFILE_TYPES.index(classify_profile({'exerce_atividade_remunerada': e, 'categoria_cnh': c})) for c in cat.categories]
+        for e in ear.categories
+    ], dtype=np.int8).reshape(len(ear.categories), len(cat.categories))
+
+    return pd.Categorical.from_codes(lookup[ear.codes, cat.codes], categories=PROFILE_TYPES)
+
+
+def parse_csv(path, columns=None):
+    """Parses a Detran CSV with the fixed `SCHEMA`, without any preprocessing.
+
+    Uses pyarrow's multi-threaded reader and only materializes the requested
+    columns.
+
+    Args:
+        path (str): Path to the CSV file.
+        columns (iterable, optional): Columns to read. Defaults to every column.
+
+    Returns:
+        pd.DataFrame: The parsed file, dimensions as categoricals.
+    """
+    # An empty include list makes pyarrow read every column of the file
+    include_columns = [] if columns is None else [col for col in SCHEMA if col in columns]
+
+    table = pacsv.read_csv(
+        path,
+        convert_options=pacsv.ConvertOptions(include_columns=include_columns, column_types=SCHEMA),
+    )
+    df = table.to_pandas()
+
+    # Dictionaries come in order of appearance; sorting them keeps groupby
+    # output in the same order the string columns used to produce
+    for col in df.columns.intersection(DIMENSION_COLUMNS):
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+
+    return df
+
+
+def read_dataset(path=DATA_PATH, columns=None):
+    """Parses and preprocesses a Detran extract.
+
+    Args:
+        path (str): Path to the CSV file.
+        columns (list, optional): Columns to return, 'tipo_atuacao' included.
+                                  Defaults to every column.
+
+    Returns:
+        pd.DataFrame: The preprocessed dataset.
+    """
+    wants_profile = columns is None or 'tipo_atuacao' in columns
+
+    if columns is None:
+        source_columns = None
+    else:
+        # faixa_etaria is always needed to drop invalid ages, and the profile
+        # is derived from the EAR flag and the category
+        source_columns = {col for col in columns if col != 'tipo_atuacao'} | {'faixa_etaria'}
+        if wants_profile:
+            source_columns |= {'exerce_atividade_remunerada', 'categoria_cnh'}
+
+    df = parse_csv(path, source_columns)
 
     # Remove drivers over 100 years old (statistically unlikely to be professionally active)
-    df = df[~df['faixa_etaria'].isin(['101-120 ANOS', '+120 ANOS'])]
+    df = df[~df['faixa_etaria'].isin(INVALID_AGE_GROUPS)].reset_index(drop=True)
+    df['faixa_etaria'] = df['faixa_etaria'].cat.remove_unused_categories()
+
+    if wants_profile:
+        df['tipo_atuacao'] = classify_profiles(df)
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    return df
+
+
+def compact(df):
+    """Collapses a dataset to one row per unique combination of the dashboard dimensions.
+
+    The pages only ever sum 'qtd_condutores' over `DIMENSION_COLUMNS`, so any
+    other attribute is redundant for them. Coordinates are the same on every
+    row of a municipality and move to a side table.
+
+    Args:
+        df (pd.DataFrame): Output of `read_dataset` with the dimensions,
+                           'qtd_condutores', 'codigo_ibge', 'lat' and 'lon'.
+
+    Returns:
+        tuple: The compacted facts (dimensions, 'qtd_condutores' and
+               'tipo_atuacao') and the municipalities table indexed by
+               'descricao_municipio' with 'codigo_ibge', 'lat' and 'lon'.
+    """
+    # Pack the category codes of each row into a single integer key, so the
+    # grouping hashes one int64 column instead of seven categoricals. Codes
+    # are shifted by one to keep missing values (-1) as their own group.
+    categories = [df[col].cat.categories for col in DIMENSION_COLUMNS]
+    shape = tuple(len(cats) + 1 for cats in categories)
+    keys = np.ravel_multi_index([df[col].cat.codes.to_numpy() + 1 for col in DIMENSION_COLUMNS], shape)
+
+    totals = pd.Series(df['qtd_condutores'].to_numpy()).groupby(keys, sort=False).sum()
+    codes = np.unravel_index(totals.index.to_numpy(), shape)
+
+    facts = pd.DataFrame({
+        col: pd.Categorical.from_codes(col_codes - 1, categories=cats)
+        for col, col_codes, cats in zip(DIMENSION_COLUMNS, codes, categories)
+    })
+    facts['qtd_condutores'] = totals.to_numpy()
+    facts['tipo_atuacao'] = classify_profiles(facts)
+
+    municipalities = df.groupby('descricao_municipio', observed=True)[['codigo_ibge', 'lat', 'lon']].first()
+    municipalities.index = municipalities.index.astype(str)
+
+    return facts, municipalities
+
+
+def read_compacted(path=DATA_PATH):
+    """Parses, preprocesses and compacts a Detran extract.
+
+    Returns:
+        tuple: The facts and municipalities from `compact`, plus a dict with
+               the row counts before and after compaction and their ratio.
+    """
+    df = read_dataset(path, DIMENSION_COLUMNS + ['qtd_condutores', 'codigo_ibge', 'lat', 'lon'])
+    facts, municipalities = compact(df)
+
+    stats = {
+        'linhas_originais': len(df),
+        'linhas_compactadas': len(facts),
+        'razao_compactacao': len(df) / len(facts) if len(facts) else 1.0,
+    }
+    return facts, municipalities, stats
+
+
+def read_files(paths, max_workers=None):
+    """Loads several Detran extracts (months or regional partitions) at once.
+
+    Files are parsed and compacted concurrently; pyarrow releases the GIL
+    while parsing, so a thread pool brings the wall time close to that of
+    the slowest file.
+
+    Args:
+        paths (str or list): Glob pattern or list of CSV paths.
+        max_workers (int, optional): Size of the thread pool. Defaults to one
+                                     per file, up to the number of CPUs.
+
+    Returns:
+        tuple: The concatenated facts, with a categorical 'fonte' column holding
+               each row's file (its path relative to the directory shared by
+               all the files), and the municipalities of every file.
+
+    Raises:
+        ValueError: If no file matches, a file is listed twice or the files
+                    don't share the same columns.
+    """
+    paths = sorted(glob.glob(paths)) if isinstance(paths, str) else list(paths)
+    if not paths:
+        raise ValueError('No files to load')
+
+    # Files with the same name in different directories keep distinct labels
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    names = [os.path.relpath(os.path.abspath(path), root) for path in paths]
+    repeated = sorted({name for name in names if names.count(name) > 1})
+    if repeated:
+        raise ValueError(f'Files listed more than once: {repeated}')
+    label = dict(zip(paths, names))
+
+    # Headers only: open_csv reads just the first block of each file
+    headers = {path: pacsv.open_csv(path).schema.names for path in paths}
+    reference = headers[paths[0]]
+    mismatched = {path: columns for path, columns in headers.items() if set(columns) != set(reference)}
+    if mismatched:
+        details = '; '.join(
+            f'{label[path]}: missing {sorted(set(reference) - set(columns))}, extra {sorted(set(columns) - set(reference))}'
+            for path, columns in mismatched.items()
+        )
+        raise ValueError(f'Schema mismatch with {label[paths[0]]}: {details}')
+
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(paths), os.cpu_count() or 1)) as pool:
+        results = list(pool.map(read_compacted, paths))
+
+    # Align the categories so the concatenation stays categorical
+    facts = [result[0] for result in results]
+    for col in facts[0].columns:
+        if isinstance(facts[0][col].dtype, pd.CategoricalDtype):
+            categories = sorted(set().union(*(part[col].cat.categories for part in facts)))
+            if col == 'tipo_atuacao':
+                categories = PROFILE_TYPES
+            for part in facts:
+                part[col] = part[col].cat.set_categories(categories)
+
+    for part, name in zip(facts, names):
+        part['fonte'] = pd.Categorical([name] * len(part), categories=names)
+
+    combined = pd.concat(facts, ignore_index=True)
+    municipalities = pd.concat([result[1] for result in results])
+    municipalities = municipalities[~municipalities.index.duplicated()]
+
+    return combined, municipalities
+
+
+def dataset_version(path=DATA_PATH):
+    """Short token that changes whenever the file at `path` is replaced or modified."""
+    stat = os.stat(path)
+    return hashlib.sha1(f'{stat.st_size}-{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+
+
+# Polling interval of the data file, in seconds
+DATASET_REFRESH_INTERVAL = 30
+
+# Snapshot pinned by the script run of the current thread
+_pinned = threading.local()
+
+
+# One manager per process, shared by every session. It parses the file once and,
+# when the file is replaced, builds the new version in the background and swaps
+# it in without blocking reruns.
+@st.cache_resource
+def _dataset_manager():
+    manager = DatasetManager(DATA_PATH, read_compacted, dataset_version, interval=DATASET_REFRESH_INTERVAL)
+    manager.on_swap(lambda old, new: _select_columns.clear())
+    return manager.start()
+
+
+def current_dataset():
+    """The dataset `Snapshot` for this script run.
+
+    The snapshot is pinned on the first call of each run, so every read in the
+    run sees the same version even if a new one goes live halfway through.
+    """
+    manager = _dataset_manager()
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return manager.current()
+
+    # ScriptRunContext.reset gives every run a new `cursors` dict
+    pin = getattr(_pinned, 'pin', None)
+    if pin is None or pin[0] is not ctx.cursors:
+        pin = _pinned.pin = (ctx.cursors, manager.current())
+    return pin[1]
+
+
+def dataset_info():
+    """Version of the dataset in use, when it went live and whether a newer one is being built."""
+    snapshot = current_dataset()
+    manager = _dataset_manager()
+    return {
+        'versao': snapshot.version,
+        'carregado_em': pd.Timestamp(snapshot.loaded_at, unit='s', tz='UTC'),
+        'atualizando': manager.building(),
+    }
+
+
+def derived(name, compute):
+    """Aggregate `compute(snapshot)` of the current dataset, computed once per version.
+
+    The aggregate is also registered with the dataset manager, so it is
+    precomputed for the next version before that version goes live. The result
+    is shared by every session; treat it as read-only.
+    """
+    _dataset_manager().register(name, compute)
+    return current_dataset().derived(name, compute)
+
+
+def coalescing_stats():
+    """Calls to shared computations ('calls'), how many waited for an identical
+    call already running instead of computing ('coalesced'), and 'in_flight'.
+
+    `st.cache_data` already lets one session compute a missing entry while the
+    others wait; these counters cover the derived aggregates of `derived`.
+    """
+    return dataset.flights.stats()
+
+
+class _FileReplaced(Exception):
+    """The data file no longer holds the version of the snapshot being read."""
+
+
+def _columns_of(snapshot, columns, compact):
+    if not compact:
+        # The file may already hold the next version (being built, or live
+        # after this run started): read it only while it is the snapshot's own.
+        # Raised rather than returned, so st.cache_data doesn't keep it.
+        if dataset_version(DATA_PATH) != snapshot.version:
+            raise _FileReplaced
+        df = read_dataset(DATA_PATH, columns)
+        if dataset_version(DATA_PATH) != snapshot.version:
+            raise _FileReplaced
+        return df
+    return snapshot.facts if columns is None else snapshot.facts[list(columns)]
+
+
+@st.cache_data
+def _select_columns(version, columns, compact, _snapshot):
+    return _columns_of(_snapshot, columns, compact)
+
+
+def load_data(columns=None, compact=True):
+    """The dashboard dataset.
+
+    Args:
+        columns (list, optional): Columns to return. Defaults to every column.
+        compact (bool): Return the compacted facts (dimensions, 'qtd_condutores'
+                        and 'tipo_atuacao'). With False, the full file is read
+                        with every original column.
+
+    Returns:
+        pd.DataFrame: The dataset. With compact=False, None while the file holds
+                      another version than this run's (a new one being built,
+                      or one that failed to load), so the data never mixes versions.
+    """
+    snapshot = current_dataset()
+    columns = None if columns is None else tuple(columns)
+    try:
+        if snapshot is not _dataset_manager().current():
+            # Run that started before a swap: don't cache the old version again,
+            # but let concurrent runs on it share the read. Each caller gets its
+            # own copy, as from st.cache_data, since pages modify the frame.
+            return dataset.flights.do((snapshot, columns, compact), lambda: _columns_of(snapshot, columns, compact)).copy()
+        return _select_columns(snapshot.version, columns, compact, snapshot)
+    except _FileReplaced:
+        return None
+
+
+def load_municipalities():
+    """Per-municipality side table ('codigo_ibge', 'lat', 'lon') indexed by name."""
+    return current_dataset().municipalities
 
-    df['tipo_atuacao'] = df.apply(classify_profile, axis=1)
 
-    return df
\ No newline at end of file
+def compaction_stats():
+    """Row counts before and after `compact` and the compaction ratio."""
+    return current_dataset().stats
@@ -0,0 +1,211 @@
+"""Process pool for the heavy pandas work of the pages.
+
+Streamlit runs every session's script in a thread of a single process, so a
+long groupby holds the GIL and stalls every other session. `WorkerPool` runs
+such computations in worker processes instead, and returns only the small
+result (aggregate tables, counts). The script thread just waits on the
+result without holding the GIL.
+
+The workers are separate interpreters started with `python -m workers`, each
+talking to the app over a private pair of pipes. They are not forked: the
+server is multi-threaded, and forking it can deadlock on locks held by other
+threads. multiprocessing's spawn and forkserver methods don't fit either,
+because they run `__main__` (the Streamlit script) again in every child.
+
+Workers don't read the data file. The first time a worker gets a task for a
+dataset version, the pool sends it that version's heavy-category rows
+(`worker_input`), and the worker keeps only those. A task is a module-level
+function `task(heavy, *args)` that needs no other rows. If a worker dies, it
+is replaced and the task runs in the calling thread instead.
+
+Pages call `offload`, which uses one pool shared by every session.
+"""
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import ForkingPickler
+
+import streamlit as st
+
+import aggregates
+import utils
+
+logger = logging.getLogger(__name__)
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def worker_input(snapshot):
+    """The rows and columns the offloaded tasks read: the "Apagão" heavy scope."""
+    return aggregates.alert_scope(snapshot.facts).drop(columns='tipo_atuacao')
+
+
+class _Worker:
+    """A worker process and the two ends of its pipes held by the app."""
+
+    def __init__(self):
+        task_r, task_w = os.pipe()
+        result_r, result_w = os.pipe()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'workers', str(task_r), str(result_w)],
+            pass_fds=(task_r, result_w),
+            cwd=_HERE,
+        )
+        os.close(task_r)
+        os.close(result_w)
+        self.tasks = Connection(task_w, readable=False)
+        self.results = Connection(result_r, writable=False)
+        # Dataset version of the rows the worker holds
+        self.version = None
+
+    def run(self, snapshot, task, args):
+        if self.version != snapshot.version:
+            # Pickled before anything is sent, so a failure here leaves the pipe in sync
+            rows = ForkingPickler.dumps(snapshot.derived('worker_input', worker_input))
+            # Announced first, so the worker drops the old rows before receiving the new ones
+            self.tasks.send(('load', snapshot.version))
+            self.tasks.send_bytes(rows)
+            self.version = snapshot.version
+        self.tasks.send(('run', (task, args)))
+        return self.results.recv()
+
+    def close(self):
+        self.tasks.close()
+        self.results.close()
+        self.process.wait()
+
+
+class WorkerPool:
+    """Worker processes that run `task(heavy, *args)` calls.
+
+    Args:
+        processes (int): Number of worker processes. Each holds the heavy rows
+                         of one dataset version.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        for _ in range(processes):
+            self._idle.put(_Worker())
+
+    def run(self, snapshot, task, *args):
+        """`task(worker_input(snapshot), *args)`, computed in a worker process.
+
+        Waits for an idle worker when all of them are busy.
+
+        Args:
+            snapshot (dataset.Snapshot): Dataset version to compute on.
+            task (callable): Module-level function, so it can be pickled.
+            *args: Extra picklable arguments for `task`.
+
+        Returns:
+            The return value of `task`.
+
+        Raises:
+            Exception: Whatever `task` raised in the worker.
+        """
+        worker = self._idle.get()
+        try:
+            ok, result = worker.run(snapshot, task, args)
+        except (EOFError, OSError):
+            # The worker died (e.g. killed for memory): replace it, compute here
+            logger.exception('Worker process died, starting a new one')
+            worker = self._replace(worker)
+            with self._lock:
+                self.fallbacks += 1
+            return task(snapshot.derived('worker_input', worker_input), *args)
+        except BaseException:
+            # Interrupted halfway through an exchange, the pipes may be out of
+            # sync, so the worker is not reused
+            worker = self._replace(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+        if not ok:
+            raise result
+        return result
+
+    @staticmethod
+    def _replace(worker):
+        worker.process.kill()
+        worker.close()
+        return _Worker()
+
+    def shutdown(self):
+        for _ in range(self.processes):
+            self._idle.get().close()
+
+
+# Worker processes for the heavy page computations, each holding the heavy rows
+# of one dataset version. None starts one per CPU; set a number to cap the
+# memory instead, or 0 to compute them in the script thread.
+WORKER_PROCESSES = None
+
+
+def pool_size():
+    """Number of worker processes the pool starts (`WORKER_PROCESSES`)."""
+    if WORKER_PROCESSES is None:
+        return os.cpu_count() or 1
+    return WORKER_PROCESSES
+
+
+@st.cache_resource
+def _pool():
+    processes = pool_size()
+    return WorkerPool(processes) if processes else None
+
+
+def offload(task, *args, snapshot=None):
+    """`task(heavy, *args)` computed in a worker process instead of the script thread.
+
+    Args:
+        task (callable): Module-level function taking the heavy rows of the
+                         dataset (`worker_input`) first and returning a small,
+                         picklable result.
+        *args: Extra picklable arguments for `task`.
+        snapshot (dataset.Snapshot, optional): Dataset version to compute on.
+                                               Defaults to this run's (`utils.current_dataset`).
+
+    Returns:
+        The return value of `task`.
+    """
+    snapshot = snapshot or utils.current_dataset()
+    pool = _pool()
+    if pool is None:
+        return task(snapshot.derived('worker_input', worker_input), *args)
+    return pool.run(snapshot, task, *args)
+
+
+def main(task_fd, result_fd):
+    """Worker loop: serves tasks until the app closes the pipes."""
+    tasks = Connection(task_fd, writable=False)
+    results = Connection(result_fd, readable=False)
+    heavy = None
+    while True:
+        try:
+            kind, payload = tasks.recv()
+        except EOFError:
+            return
+        if kind == 'load':
+            heavy = None
+            heavy = tasks.recv()
+            continue
+
+        task, args = payload
+        try:
+            result = (True, task(heavy, *args))
+        except Exception as exc:
+            result = (False, exc)
+        results.send(result)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]), int(sys.argv[2]))